@@ -1,102 +1,1382 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 import subprocess
 import os
 import json
+import shutil
+import atexit
+import signal
+import sys
+import time
+import gzip
+import queue
+import threading
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeout
+
+from job_queue import JobQueue, QueueFull
+from result_cache import ResultCache, normalize_input
+from warm_pool import ContainerPool
+from partial_results import WorkspaceWatcher, collect_partial_results
+from result_store import ResultStore
+from batch_scheduler import BatchScheduler
+from pivot import PivotOrchestrator
+from tool_outputs import split_by_tool, merge_tool_outputs, fresh_tools, ok_tools
+from metrics import MetricsRegistry
+from rate_limiter import RateLimiter
+from blob_store import BlobStore
+from result_views import RenderedViews, result_etag, select_tools, shape_result, supported_encodings
 
 app = Flask(__name__, static_folder="static", template_folder="static")
 
-# Mapping entities to their Docker container details
+# Mapping entities to their Docker container details. Each job gets its own
+# workspace under "<output_dir>/jobs/<job_id>", which is mounted into the
+# container and handed to the scripts through OUTPUT_DIR. <ENTITY>_IMAGE picks
+# another image, e.g. the fast-start builds (Dockerfile.fast) tagged ":fast".
 DOCKER_CONTAINERS = {
     "email": {
-        "image": "email-setup",
+        "image": os.getenv("EMAIL_IMAGE", "email-setup"),
+        "env_var": "EMAIL",
         "output_dir": "./email-setup/Combined_folder/",
-        "command": lambda input_value: [
-            "docker", "run", "--rm", "-e", f"EMAIL={input_value}", "-v",
-            f"{os.path.abspath('./email-setup/Combined_folder')}:/app/Combined_folder", "email-setup"
-        ]
+        "output_file": lambda input_value: "final_output.json",
+        # Used to run jobs in warm containers; the tools need no activated venv
+        "exec_command": ["python3", "/app/finalScript.py"],
+        # finalScript.py stops the tools on SIGTERM, so a cancel lets it record their status
+        "stops_on_sigterm": True
     },
     "phone": {
-        "image": "phoneinfo-tool",
+        "image": os.getenv("PHONE_IMAGE", "phoneinfo-tool"),
+        "env_var": "PHONE_NUMBER",
         "output_dir": "./phoneinfo-setup/phonenum_op/",
-        "command": lambda input_value: [
-            "docker", "run", "--rm", "-e", f"PHONE_NUMBER={input_value}", "-v",
-            f"{os.path.abspath('./phoneinfo-setup/phonenum_op')}:/app/output", "phoneinfo-tool"
-        ]
+        "output_file": lambda input_value: f"{input_value}.json",
+        "exec_command": ["python3", "/app/script.py"]
     },
     "username": {
-        "image": "username-setup",
+        "image": os.getenv("USERNAME_IMAGE", "username-setup"),
+        "env_var": "USERNAME",
+        # ScriptP3.py scans a comma separated USERNAMES list in one run
+        "group_env_var": "USERNAMES",
+        # USERNAME_PROXY_CACHE=1 routes the tools through the container's caching proxy.
+        # Its certificates live in a docker volume so every container reuses one CA;
+        # its responses are cached in memory, so they only outlive a scan with SCAN_MODE=warm.
+        "extra_env": {"PROXY_CACHE": os.getenv("USERNAME_PROXY_CACHE", "0")},
+        "volumes": [f"{os.getenv('USERNAME_PROXY_CERT_VOLUME', 'username-proxy-certs')}:/tmp/cache-proxy"]
+        if os.getenv("USERNAME_PROXY_CACHE", "0") == "1" else [],
         "output_dir": "./username-setup/username_op/",
-        "command": lambda input_value: [
-            "docker", "run", "--rm", "-e", f"USERNAME={input_value}", "-v",
-            f"{os.path.abspath('./username-setup/username_op')}:/app/combined_output", "username-setup"
-        ]
+        "output_file": lambda input_value: "final_output.json",
+        "exec_command": ["python3", "/app/finalScript.py"]
     }
 }
 
-# Serve the HTML file
-@app.route("/")
-def serve_index():
-    return render_template("index.html")
+# "run" starts a fresh container per scan, "warm" dispatches scans to
+# long-lived containers with docker exec
+SCAN_MODE = os.getenv("SCAN_MODE", "run")
+
+# Warm containers are replaced after this many jobs
+WARM_POOL_MAX_JOBS = int(os.getenv("WARM_POOL_MAX_JOBS", "25"))
+
+# Seconds between health checks of an idle warm container
+WARM_POOL_HEALTH_INTERVAL = int(os.getenv("WARM_POOL_HEALTH_INTERVAL", "60"))
+
+# Worker pool size per entity type
+SCAN_CONCURRENCY = {
+    "email": int(os.getenv("EMAIL_SCAN_WORKERS", "2")),
+    "phone": int(os.getenv("PHONE_SCAN_WORKERS", "4")),
+    "username": int(os.getenv("USERNAME_SCAN_WORKERS", "2")),
+}
+
+# Scans running at once across all entity types (0 = only the per-entity pools limit them)
+MAX_RUNNING_SCANS = int(os.getenv("MAX_RUNNING_SCANS", "0"))
+
+# Scans that may wait for a worker per entity type; beyond that new scans get a 503
+MAX_QUEUED_SCANS = int(os.getenv("MAX_QUEUED_SCANS", "20"))
+
+# SERVE_MODE=production runs "python app.py" under waitress instead of the
+# Werkzeug dev server; gunicorn.conf.py does the same for gunicorn
+SERVE_MODE = os.getenv("SERVE_MODE", "dev")
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+
+# Origins of static servers (e.g. VS Code Live Server) allowed to call the API
+# from the result pages, comma separated
+CORS_ORIGINS = [
+    origin for origin in os.getenv("CORS_ORIGINS", "http://127.0.0.1:5501,http://localhost:5501").split(",") if origin
+]
+
+# Folder holding the site pages (index.html, the result pages) and their assets
+SITE_DIR = os.path.dirname(os.path.abspath(__file__))
+SITE_PAGES = {"index", "about", "result", "user-results", "phone-results"}
+
+# Request threads of the WSGI server. There is one server process, since jobs,
+# the rate limiter and coalescing live in its memory.
+WEB_THREADS = int(os.getenv("WEB_THREADS", "32"))
+
+# Requests that may hold a thread while they wait on a scan. The rest of the
+# threads stay free to answer polls, cached lookups and 503s straight away.
+MAX_WAITING_REQUESTS = int(os.getenv("MAX_WAITING_REQUESTS", str(max(1, WEB_THREADS - 8))))
+
+# How long finished jobs stay pollable, in seconds
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# How long a scan result stays fresh per entity type, in seconds (0 disables caching)
+CACHE_TTL_SECONDS = {
+    "email": int(os.getenv("EMAIL_CACHE_TTL", "21600")),
+    "phone": int(os.getenv("PHONE_CACHE_TTL", "86400")),
+    "username": int(os.getenv("USERNAME_CACHE_TTL", "3600")),
+}
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+
+# Rendered and compressed /results views kept for repeat requests
+RESULT_VIEW_CACHE_ENTRIES = int(os.getenv("RESULT_VIEW_CACHE_ENTRIES", "64"))
+
+# Largest page of a per-tool array the /results endpoint returns
+RESULT_PAGE_MAX = 1000
+
+# Most inputs given to one container run when a batch scans an entity that
+# supports grouping (only usernames: maigret, sherlock and socialscan take several)
+BATCH_GROUP_SIZE = int(os.getenv("BATCH_GROUP_SIZE", "5"))
+
+# How far a pivot follows discovered entities (email -> username -> phone is 2),
+# and the most scans one pivot may start
+PIVOT_MAX_DEPTH = int(os.getenv("PIVOT_MAX_DEPTH", "2"))
+PIVOT_MAX_NODES = int(os.getenv("PIVOT_MAX_NODES", "25"))
+
+# Largest number of inputs accepted in one batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# SQLite file indexing findings across scans (empty disables the store)
+RESULT_DB = os.getenv("RESULT_DB", "./results.db")
+
+# Folder keeping every raw tool output file, compressed and deduplicated by content,
+# with a manifest per job (empty disables it). BLOB_COMPRESSION is zlib or lzma.
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "./raw_outputs")
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zlib")
+
+# How long each tool's stored output stays fresh, in seconds; a rescan only reruns
+# the tools whose output is older. <TOOL>_FRESHNESS overrides, e.g. HOLEHE_FRESHNESS.
+# Needs the result store.
+TOOL_FRESHNESS = {
+    entity: {tool: int(os.getenv(f"{tool.upper().replace('-', '_')}_FRESHNESS", str(seconds))) for tool, seconds in tools.items()}
+    for entity, tools in {
+        "email": {"Breach-Checker": 86400, "Holehe": 21600, "BreachCheck": 86400},
+        "phone": {"phoneinfoga": 86400, "phunter": 86400},
+        "username": {"maigret": 3600, "sherlock": 3600, "socialscan": 3600, "blackbird": 3600},
+    }.items()
+}
+
+# Token buckets for the upstream APIs whose keys every container shares, set with
+# <API>_RATE_PER_MINUTE, <API>_BURST and <API>_DAILY_QUOTA (0 = no daily quota)
+UPSTREAM_API_LIMITS = {
+    api: {
+        "rate_per_minute": float(os.getenv(f"{api.upper()}_RATE_PER_MINUTE", str(rate))),
+        "burst": int(os.getenv(f"{api.upper()}_BURST", str(burst))),
+        "daily_quota": int(os.getenv(f"{api.upper()}_DAILY_QUOTA", "0")),
+    }
+    for api, rate, burst in (("breacheddirectory", 10, 3), ("numverify", 6, 2))
+}
+
+# Tools that call those APIs
+TOOL_APIS = {
+    "email": {"BreachCheck": "breacheddirectory"},
+    "phone": {"phoneinfoga": "numverify"},
+}
+
+# Where containers reach this app's /rate-limit endpoints, e.g.
+# http://host.docker.internal:5000/rate-limit. When unset, a job takes the
+# tokens for its tools before its container starts instead.
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")
+
+# Longest a job waits for a token before running without the tool
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+
+# End-to-end deadline of a scan in seconds, counted from the request (queue wait
+# included). A request may ask for a shorter one with "deadline".
+SCAN_DEADLINE_SECONDS = int(os.getenv("SCAN_DEADLINE_SECONDS", "1800"))
+
+# Seconds a container gets past the deadline to merge what its tools collected
+# before it is killed
+DEADLINE_GRACE_SECONDS = int(os.getenv("DEADLINE_GRACE_SECONDS", "15"))
+
+# Seconds a cancelled container that handles SIGTERM gets to stop its tools before it is killed
+STOP_GRACE_SECONDS = int(os.getenv("STOP_GRACE_SECONDS", "5"))
+
+# Seconds between checks of a job workspace for new tool output while streaming
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "0.5"))
+
+# Send an SSE comment after this many quiet seconds to keep proxies from closing the stream
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+class ScanError(Exception):
+    """Error raised while running a scan, carrying the HTTP status to return."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Validate the request body and return the entity and normalized input value
+def parse_scan_request(data):
+    data = data or {}
+    entity = data.get("entity")
+    input_value = data.get("inputValue")
+
+    if not entity or not input_value:
+        raise ScanError("Entity and input value are required", 400)
+    if not isinstance(input_value, (str, int)) or isinstance(input_value, bool):
+        raise ScanError("Input value must be a string", 400)
+
+    # Get the corresponding Docker container details
+    if entity not in DOCKER_CONTAINERS:
+        raise ScanError("Invalid entity selected", 400)
 
-# Endpoint to fetch entity data
-@app.route("/fetch-entity-data", methods=["POST"])
-def fetch_entity_data():
     try:
-        # Parse request JSON
-        data = request.get_json()
-        entity = data.get("entity")
-        input_value = data.get("inputValue")
+        return entity, normalize_input(entity, input_value)
+    except ValueError as e:
+        raise ScanError(str(e), 400)
+
+
+# Absolute deadline of a scan: the request's "deadline" in seconds, capped at SCAN_DEADLINE_SECONDS
+def parse_deadline(data):
+    seconds = (data or {}).get("deadline")
+    if seconds is None:
+        return time.time() + SCAN_DEADLINE_SECONDS
+    try:
+        seconds = float(seconds)
+    except (TypeError, ValueError):
+        raise ScanError("deadline must be a number of seconds", 400)
+    if seconds <= 0:
+        raise ScanError("deadline must be positive", 400)
+    return time.time() + min(seconds, SCAN_DEADLINE_SECONDS)
+
+
+# Whether the caller asked to rerun every tool, even those with fresh stored output.
+# A refresh asks for a new scan, so it reruns every tool too.
+def wants_full_rescan(data):
+    if flag((data or {}).get("full_rescan")) or wants_refresh(data):
+        return True
+    return flag(request.args.get("full"))
+
+
+# Concurrent lookups of the same target share one scan. Raw scans are not shared,
+# as their merged file is streamed to a single caller and then deleted.
+def scan_key(entity, input_value, full=False):
+    return (entity, input_value, full)
+
+
+# Whether the caller asked to bypass the cache, via the body or ?refresh=1
+def wants_refresh(data):
+    return flag((data or {}).get("refresh")) or flag(request.args.get("refresh"))
+
+
+# A boolean option from a JSON body or a query string, where "0", "false" and "no" are false
+def flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
 
-        if not entity or not input_value:
-            return jsonify({"error": "Entity and input value are required"}), 400
 
-        # Get the corresponding Docker container details
-        container_details = DOCKER_CONTAINERS.get(entity)
-        if not container_details:
-            return jsonify({"error": "Invalid entity selected"}), 400
+# Host path of the private output folder for a job
+def job_workspace(entity, job_id):
+    return os.path.join(DOCKER_CONTAINERS[entity]["output_dir"], "jobs", job_id)
+
+
+# Bind mount exposing every job workspace of an entity at /app/jobs
+def jobs_volume(entity):
+    jobs_dir = os.path.abspath(os.path.join(DOCKER_CONTAINERS[entity]["output_dir"], "jobs"))
+    return f"{jobs_dir}:/app/jobs"
+
+
+# docker -v arguments of an entity's containers: the job workspaces plus its own volumes
+def volume_args(entity):
+    volumes = [jobs_volume(entity), *DOCKER_CONTAINERS[entity].get("volumes", [])]
+    return [arg for volume in volumes for arg in ("-v", volume)]
+
+
+# Environment variables handed to the container scripts for a job. Raw jobs
+# ask the merge step for gzip output that is passed to the client untouched,
+# grouped jobs pass several inputs at once.
+def scan_environment(entity, input_value, job_id, raw=False, group=None, deadline=None, tools=None):
+    env = {"OUTPUT_DIR": f"/app/jobs/{job_id}", **DOCKER_CONTAINERS[entity].get("extra_env", {})}
+    if tools is not None:
+        # Only these tools run; the others' stored output is still fresh (or out of quota)
+        env["SCAN_TOOLS"] = ",".join(tools)
+    if RATE_LIMIT_URL:
+        env["RATE_LIMIT_URL"] = RATE_LIMIT_URL
+    if deadline:
+        # The scripts cut their tools off at this epoch time
+        env["SCAN_DEADLINE"] = f"{deadline:.3f}"
+    if group:
+        env[DOCKER_CONTAINERS[entity]["group_env_var"]] = ",".join(group)
+    else:
+        env[DOCKER_CONTAINERS[entity]["env_var"]] = input_value
+    if raw:
+        env["MERGE_GZIP"] = "1"
+    return env
+
+
+# Name of the one-off container running a job, so it can be killed
+def scan_container_name(job_id):
+    return f"scan-{job_id}"
+
+
+# Generate the docker run command for a one-off container
+def docker_run_command(entity, input_value, job_id, raw=False, group=None, deadline=None, tools=None):
+    env = scan_environment(entity, input_value, job_id, raw, group, deadline, tools)
+    env_args = [arg for key, value in env.items() for arg in ("-e", f"{key}={value}")]
+    return [
+        "docker", "run", "--rm", "--name", scan_container_name(job_id), *env_args, *volume_args(entity),
+        *host_gateway_args(), DOCKER_CONTAINERS[entity]["image"]
+    ]
+
+
+# Let containers reach the rate limiter on the host as host.docker.internal
+def host_gateway_args():
+    return ["--add-host", "host.docker.internal:host-gateway"] if RATE_LIMIT_URL else []
+
+
+# Containers of running scans by job id, so cancelling a job can kill its container
+running_scans = {}
+running_scans_lock = threading.Lock()
+
+
+def kill_container(name):
+    subprocess.run(["docker", "kill", name], capture_output=True, text=True)
+
+
+# Send SIGTERM so the scripts stop their tools cleanly, and kill the container
+# if it is still running STOP_GRACE_SECONDS later
+def stop_container(name):
+    subprocess.run(["docker", "kill", "--signal", "TERM", name], capture_output=True, text=True)
+    timer = threading.Timer(STOP_GRACE_SECONDS, kill_container, args=(name,))
+    timer.daemon = True
+    timer.start()
+
+
+# Job queue canceller: stop or kill the job's container (its tools die with it)
+def cancel_scan(job):
+    with running_scans_lock:
+        scan = running_scans.get(job["id"])
+        if scan is None:
+            # Not running yet; run_entity_scan sees the job's cancel_requested when it starts
+            return
+        scan["cancelled"] = True
+        container = scan["container"]
+    if container and scan.get("graceful"):
+        print(f"Cancelling job {job['id']}, stopping container {container}")
+        stop_container(container)
+    elif container:
+        print(f"Cancelling job {job['id']}, killing container {container}")
+        kill_container(container)
+
+
+# Result of a scan stopped by its deadline or a cancel: whatever the tools left in
+# the workspace, as {file: data}. The merged file may be half written, so it is skipped.
+def partial_scan_result(entity, input_value, job_id, workspace, raw=False, group=None):
+    output_file = DOCKER_CONTAINERS[entity]["output_file"]
+
+    def collect(folder, value):
+        return collect_partial_results(folder, skip=[output_file(value), output_file(value) + ".gz"])
+
+    if group:
+        return {name: collect(os.path.join(workspace, name), name) or None for name in group}
+    result = collect(workspace, input_value)
+    if raw:
+        os.makedirs(results_dir(entity), exist_ok=True)
+        kept_path = os.path.join(results_dir(entity), job_id + ".json")
+        with open(kept_path, "w", encoding="utf-8") as file:
+            json.dump(result, file)
+        return {"output_path": kept_path, "gzip": False}
+    return result
+
+
+# Folder that keeps raw merged outputs until they have been streamed to the client
+def results_dir(entity):
+    return os.path.join(DOCKER_CONTAINERS[entity]["output_dir"], "results")
+
+
+# Keep the raw tool files a scan left in its workspace, before the workspace is
+# removed. The merged output is left out: it can be rebuilt from them.
+def archive_raw_outputs(entity, input_value, job_id, workspace, group=None, timings=None):
+    if not blob_store or not os.path.isdir(workspace):
+        return
+    output_file = DOCKER_CONTAINERS[entity]["output_file"]
+    merged = [f"{name}/{output_file(name)}" for name in group] if group else [output_file(input_value)]
+    started = time.monotonic()
+    try:
+        manifest = blob_store.archive_job(
+            job_id, entity, input_value, workspace, skip={*merged, *(path + ".gz" for path in merged)}
+        )
+        if timings is not None:
+            timings["raw_outputs"] = len(manifest["files"])
+            timings.setdefault("stages", {})["archive"] = round(time.monotonic() - started, 3)
+    except Exception as e:
+        # Archiving is best effort; the scan result is not affected
+        print(f"Error archiving raw outputs of job {job_id}: {e}")
+
+
+# Copy the per-tool status, stage timings and cache proxy stats the container
+# scripts leave in the workspace into timings, before the workspace is removed
+def read_container_timings(workspace, timings):
+    for name, key in (
+        ("_tool_status.json", "tools"), ("_timings.json", "container_stages"), ("_proxy_stats.json", "proxy_cache")
+    ):
+        path = os.path.join(workspace, name)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        timings[key] = data.get("stages", {}) if key == "container_stages" else data
+
+
+# Run the Docker container for an entity and return the parsed output JSON.
+# With raw=True the merged file is kept as is and its location is returned instead.
+# With a group of inputs, returns {input: parsed output or None}.
+# Stage durations go into timings["stages"] when a timings dict is given.
+# Past the deadline (epoch seconds) or once cancelled, the container is killed and
+# the partial tool output is returned, with timings["partial"] set to the reason.
+# With tools, only those tools run.
+def run_entity_scan(entity, input_value, job_id, raw=False, group=None, timings=None, deadline=None, tools=None):
+    container_details = DOCKER_CONTAINERS[entity]
+    timings = timings if timings is not None else {}
+    stages = timings.setdefault("stages", {})
+    deadline = deadline or time.time() + SCAN_DEADLINE_SECONDS
+    if deadline <= time.time():
+        raise ScanError("Scan deadline passed before the scan started", 504)
+    workspace = job_workspace(entity, job_id)
+    os.makedirs(workspace, exist_ok=True)
+
+    pool = get_warm_pool(entity)
+    started = time.monotonic()
+    try:
+        container = pool.acquire(timeout=max(0.0, deadline - time.time())) if pool else None
+    except queue.Empty:
+        shutil.rmtree(workspace, ignore_errors=True)
+        raise ScanError("Scan deadline passed while waiting for a warm container", 504)
+    if pool:
+        stages["acquire"] = round(time.monotonic() - started, 3)
+    failed = False
+
+    # A warm container runs one job at a time, so it can be killed like a one-off one.
+    # Its PID 1 is sleep, which ignores SIGTERM, so only one-off containers are stopped gracefully.
+    with running_scans_lock:
+        job = job_queue.get(job_id)
+        scan = running_scans[job_id] = {"cancelled": bool(job and job["cancel_requested"])}
+        scan["container"] = container["name"] if container else scan_container_name(job_id)
+        scan["graceful"] = container is None and container_details.get("stops_on_sigterm", False)
+
+    try:
+        if scan["cancelled"]:
+            raise ScanError("Scan cancelled", 409)
 
         # Generate the Docker command
-        docker_command = container_details["command"](input_value)
+        if container:
+            docker_command = pool.exec_command(
+                container, scan_environment(entity, input_value, job_id, raw, group, deadline, tools),
+                container_details["exec_command"]
+            )
+        else:
+            docker_command = docker_run_command(entity, input_value, job_id, raw, group, deadline, tools)
 
         # Run the Docker container with the correct command
-        process = subprocess.run(
-            docker_command,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding="utf-8"  # Ensure UTF-8 encoding
-        )
+        started = time.monotonic()
+        stopped = None
+        try:
+            process = subprocess.run(
+                docker_command,
+                check=True,
+                capture_output=True,
+                text=True,
+                encoding="utf-8",  # Ensure UTF-8 encoding
+                timeout=max(0.0, deadline - time.time()) + DEADLINE_GRACE_SECONDS
+            )
+        except subprocess.TimeoutExpired:
+            # The scripts stop their tools at the deadline; a container still going is stuck
+            failed = True
+            stopped = "deadline"
+            kill_container(scan["container"])
+        except subprocess.CalledProcessError as e:
+            failed = True
+            if scan["cancelled"]:
+                stopped = "cancelled"
+            else:
+                # Log the error details and surface them to the caller
+                error_message = e.stderr if e.stderr else str(e)
+                print(f"Error running Docker: {error_message}")
+                raise ScanError(f"Error running Docker: {error_message}")
+        finally:
+            stages["docker"] = round(time.monotonic() - started, 3)
+
+        if stopped:
+            print(f"Scan {job_id} stopped ({stopped}), returning its partial results")
+            timings["partial"] = stopped
+            return partial_scan_result(entity, input_value, job_id, workspace, raw, group)
         print(f"Docker command output: {process.stdout}")
 
+        started = time.monotonic()
+
+        # Grouped runs leave each input's merged output in its own subfolder
+        if group:
+            results = {}
+            for name in group:
+                path = os.path.join(workspace, name, container_details["output_file"](name))
+                results[name] = None
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as file:
+                        results[name] = json.load(file)
+            stages["load"] = round(time.monotonic() - started, 3)
+            return results
+
         # Handle output JSON file path
-        output_dir = container_details["output_dir"]
-        if entity == "phone":
-            # Dynamically generate output file name for phone
-            json_file_path = os.path.join(output_dir, f"{input_value}.json")
-        else:
-            # Predefined file names for email and username
-            json_file_path = os.path.join(output_dir, "final_output.json")
+        json_file_path = os.path.join(workspace, container_details["output_file"](input_value))
+
+        # Keep the merged file (gzipped when the merge step supports it) for streaming
+        if raw:
+            for path, compressed in ((json_file_path + ".gz", True), (json_file_path, False)):
+                if os.path.exists(path):
+                    os.makedirs(results_dir(entity), exist_ok=True)
+                    kept_path = os.path.join(results_dir(entity), job_id + (".json.gz" if compressed else ".json"))
+                    shutil.move(path, kept_path)
+                    return {"output_path": kept_path, "gzip": compressed}
 
         # Check if the output file exists
         if not os.path.exists(json_file_path):
-            return jsonify({"error": f"No output file found for {entity}"}), 500
+            raise ScanError(f"No output file found for {entity}")
 
         # Read and return the JSON file contents
         with open(json_file_path, "r", encoding="utf-8") as file:
             output_data = json.load(file)
+        stages["load"] = round(time.monotonic() - started, 3)
+        return output_data
+    finally:
+        with running_scans_lock:
+            running_scans.pop(job_id, None)
+        read_container_timings(workspace, timings)
+        archive_raw_outputs(entity, input_value, job_id, workspace, group, timings)
+        if container:
+            pool.release(container, failed=failed)
+        # The result has been read (or the scan failed), so drop the workspace
+        settle_workspace_watchers(job_id)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+# Cache a finished scan and index it in the result store. Partial results are
+# only indexed, so the next request runs the scan again.
+def remember_result(job_id, entity, input_value, result, partial=False):
+    if not partial:
+        result_cache.put(entity, input_value, result)
+    if result_store:
+        try:
+            result_store.record_scan(job_id, entity, input_value, result)
+        except Exception as e:
+            # Indexing is best effort; the caller still gets the scan result
+            print(f"Error recording scan in result store: {e}")
+
+
+# Worker pool entry point for a queued job; its stage timings are kept on the job
+def run_job(job):
+    timings = job["timings"] = {"queue_wait": round(job["started_at"] - job["created_at"], 3), "stages": {}}
+    started = time.monotonic()
+    status = "failed"
+    try:
+        result = scan_job(job, timings)
+        status = "done"
+        return result
+    finally:
+        if job["cancel_requested"]:
+            status = "cancelled"
+        job["partial"] = scan_is_partial(timings)
+        timings["total"] = round(time.monotonic() - started, 3)
+        record_job_timings(job, timings, status)
 
-        return jsonify(output_data)
 
-    except subprocess.CalledProcessError as e:
-        # Log the error details and return an error response
-        error_message = e.stderr if e.stderr else str(e)
-        print(f"Error running Docker: {error_message}")
-        return jsonify({"error": f"Error running Docker: {error_message}"}), 500
+# Keep the output of each tool that finished cleanly, for later incremental rescans
+def save_tool_outputs(entity, input_value, result, tools):
+    if not result_store:
+        return
+    fragments = split_by_tool(entity, input_value, result)
+    try:
+        # A tool that finished without writing anything found nothing, which is a result too
+        result_store.save_tool_outputs(entity, input_value, {tool: fragments.get(tool, {}) for tool in tools})
+    except Exception as e:
+        print(f"Error saving tool outputs in result store: {e}")
+
+
+# Drop the tools whose upstream API has no quota left. Without RATE_LIMIT_URL the
+# job also waits here for each tool's token, since the container cannot ask for it.
+def plan_api_tools(entity, tools, deadline, timings):
+    planned = []
+    for tool in tools:
+        api = TOOL_APIS.get(entity, {}).get(tool)
+        if api is None:
+            granted = True
+        elif RATE_LIMIT_URL:
+            granted = not rate_limiter.quota_exhausted(api)
+        else:
+            started = time.monotonic()
+            granted, _ = rate_limiter.acquire(api, timeout=min(RATE_LIMIT_MAX_WAIT, max(0.0, deadline - time.time())))
+            timings["stages"]["rate_limit"] = round(time.monotonic() - started, 3)
+        if granted:
+            planned.append(tool)
+        else:
+            print(f"Skipping {tool}: no {api} quota or token available")
+            timings.setdefault("rate_limited_tools", []).append(tool)
+    return planned
+
+
+# Rescan only the tools whose stored output is stale and merge their new output
+# into the stored output of the others. Jobs with the "full" option run every tool.
+def incremental_scan(job, timings, deadline):
+    entity, input_value = job["entity"], job["input"]
+    stored = result_store.tool_outputs(entity, input_value) if result_store else {}
+    fresh = set() if job["options"].get("full") else fresh_tools(stored, TOOL_FRESHNESS[entity])
+    stale = [tool for tool in TOOL_FRESHNESS[entity] if tool not in fresh]
+    timings["reused_tools"] = sorted(fresh)
+
+    fragments = {tool: output["data"] for tool, output in stored.items()}
+    planned = plan_api_tools(entity, stale, deadline, timings)
+    if planned:
+        result = run_entity_scan(
+            entity, input_value, job["id"], timings=timings, deadline=deadline,
+            tools=planned if len(planned) < len(TOOL_FRESHNESS[entity]) else None
+        )
+        ok = ok_tools(timings.get("tools", []))
+        save_tool_outputs(entity, input_value, result, ok)
+        # First scan of this target: nothing to merge with
+        if not stored:
+            return result
+        # A tool that failed this time without writing anything keeps its older output
+        new_fragments = split_by_tool(entity, input_value, result)
+        for tool in planned:
+            if tool in ok or tool in new_fragments:
+                fragments[tool] = new_fragments.get(tool, {})
+    return merge_tool_outputs(entity, input_value, fragments)
+
+
+# Whether a scan was stopped early or some of its tools were cut off by the deadline
+def scan_is_partial(timings):
+    return (
+        bool(timings.get("partial")) or bool(timings.get("rate_limited_tools"))
+        or any(tool.get("status") in ("deadline", "rate_limited") for tool in timings.get("tools", []))
+    )
+
+
+def scan_job(job, timings):
+    options = job["options"]
+    # Jobs submitted without a deadline (batches) get the default one
+    deadline = options.get("deadline") or job["created_at"] + SCAN_DEADLINE_SECONDS
+    if options.get("raw"):
+        tools = list(TOOL_FRESHNESS[job["entity"]])
+        planned = plan_api_tools(job["entity"], tools, deadline, timings)
+        if not planned:
+            raise ScanError("No upstream API quota left for this scan", 429)
+        return run_entity_scan(
+            job["entity"], job["input"], job["id"], raw=True, timings=timings, deadline=deadline,
+            tools=planned if len(planned) < len(tools) else None
+        )
+    if options.get("group"):
+        results = run_entity_scan(
+            job["entity"], None, job["id"], group=options["group"], timings=timings, deadline=deadline
+        )
+        for input_value, result in results.items():
+            if result is not None:
+                save_tool_outputs(job["entity"], input_value, result, ok_tools(timings.get("tools", []), input_value))
+                remember_result(job["id"], job["entity"], input_value, result, partial=scan_is_partial(timings))
+        return results
+    result = incremental_scan(job, timings, deadline)
+    started = time.monotonic()
+    remember_result(job["id"], job["entity"], job["input"], result, partial=scan_is_partial(timings))
+    timings["stages"]["store"] = round(time.monotonic() - started, 3)
+    return result
+
+
+# Log a job's timing record and add it to the /metrics histograms
+def record_job_timings(job, timings, status):
+    entity = job["entity"]
+    stages = timings["stages"]
+    container_stages = timings.get("container_stages", {})
+    # Whatever docker took beyond the scripts is container start (and venv activation)
+    if "docker" in stages and container_stages:
+        stages["container_start"] = round(max(0.0, stages["docker"] - sum(container_stages.values())), 3)
+
+    print(f"Job timings: {json.dumps({'job_id': job['id'], 'entity': entity, 'status': status, **timings})}")
+
+    scan_jobs.inc(entity=entity, status=status)
+    scan_duration.observe(timings["total"], entity=entity)
+    queue_wait.observe(timings["queue_wait"], entity=entity)
+    for stage, duration in {**container_stages, **stages}.items():
+        stage_duration.observe(duration, entity=entity, stage=stage)
+    for tool in timings.get("tools", []):
+        tool_runs.inc(entity=entity, tool=tool["tool"], status=tool["status"])
+        if tool.get("duration") is not None:
+            tool_duration.observe(tool["duration"], entity=entity, tool=tool["tool"])
+    for tool in timings.get("reused_tools", []):
+        tools_reused.inc(entity=entity, tool=tool)
+    for result in ("hits", "misses", "coalesced"):
+        if timings.get("proxy_cache", {}).get(result):
+            proxy_requests.inc(timings["proxy_cache"][result], entity=entity, result=result)
+
+
+# Start one warm container per worker so a pooled scan never waits on docker run
+# Started on the first scan rather than at import: the dev server's reloader imports
+# this module in two processes, and only the one serving requests should own containers
+def start_warm_pools():
+    pools = {}
+    for entity, details in DOCKER_CONTAINERS.items():
+        os.makedirs(os.path.join(details["output_dir"], "jobs"), exist_ok=True)
+        pools[entity] = ContainerPool(
+            details["image"], SCAN_CONCURRENCY[entity], run_args=[*volume_args(entity), *host_gateway_args()],
+            max_jobs=WARM_POOL_MAX_JOBS, health_interval=WARM_POOL_HEALTH_INTERVAL
+        )
+        pools[entity].start()
+        atexit.register(pools[entity].shutdown)
+    return pools
+
+
+warm_pools = {}
+warm_pools_lock = threading.Lock()
+
+
+# The warm container pool of an entity, or None when scans use docker run
+def get_warm_pool(entity):
+    if SCAN_MODE != "warm":
+        return None
+    with warm_pools_lock:
+        if not warm_pools:
+            warm_pools.update(start_warm_pools())
+    return warm_pools.get(entity)
+
+
+rate_limiter = RateLimiter(UPSTREAM_API_LIMITS)
+result_cache = ResultCache(CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+rendered_views = RenderedViews(RESULT_VIEW_CACHE_ENTRIES)
+result_store = ResultStore(RESULT_DB) if RESULT_DB else None
+blob_store = BlobStore(BLOB_STORE_DIR, BLOB_COMPRESSION) if BLOB_STORE_DIR else None
+job_queue = JobQueue(
+    run_job, SCAN_CONCURRENCY, retention=JOB_RETENTION_SECONDS, canceller=cancel_scan,
+    max_queued=MAX_QUEUED_SCANS, max_running=MAX_RUNNING_SCANS
+)
+waiting_requests = threading.BoundedSemaphore(MAX_WAITING_REQUESTS)
+batch_scheduler = BatchScheduler(
+    job_queue, SCAN_CONCURRENCY,
+    group_sizes={entity: BATCH_GROUP_SIZE for entity, details in DOCKER_CONTAINERS.items() if "group_env_var" in details},
+    retention=JOB_RETENTION_SECONDS, coalesce_key=scan_key
+)
+pivot_orchestrator = PivotOrchestrator(
+    job_queue, max_depth=PIVOT_MAX_DEPTH, max_nodes=PIVOT_MAX_NODES, retention=JOB_RETENTION_SECONDS,
+    coalesce_key=scan_key
+)
+
+# Prometheus metrics served at /metrics
+metrics = MetricsRegistry()
+scan_jobs = metrics.counter("scan_jobs_total", "Finished scan jobs by outcome.", ["entity", "status"])
+scan_duration = metrics.histogram("scan_job_duration_seconds", "Time a scan job spent running.", ["entity"])
+queue_wait = metrics.histogram("scan_queue_wait_seconds", "Time a scan job waited for a worker.", ["entity"])
+stage_duration = metrics.histogram(
+    "scan_stage_duration_seconds",
+    "Time per scan stage (acquire, docker, container_start, tools, merge, load, store).", ["entity", "stage"]
+)
+tool_duration = metrics.histogram("scan_tool_duration_seconds", "Time each tool ran inside the container.", ["entity", "tool"])
+tool_runs = metrics.counter("scan_tool_runs_total", "Tool runs by outcome (ok, failed, timeout, cancelled).", ["entity", "tool", "status"])
+tools_reused = metrics.counter(
+    "scan_tools_reused_total", "Tools skipped by a rescan because their stored output was fresh.", ["entity", "tool"]
+)
+proxy_requests = metrics.counter(
+    "scan_proxy_cache_requests_total", "Tool HTTP requests through the container cache proxy.", ["entity", "result"]
+)
+for stat, metric_type in (("tokens", "gauge"), ("used_today", "gauge"), ("granted", "counter"), ("denied", "counter")):
+    metrics.callback(
+        f"rate_limit_{stat}" + ("_total" if metric_type == "counter" else ""), metric_type,
+        f"Upstream API rate limiter {stat.replace('_', ' ')}.",
+        lambda stat=stat: {(api,): stats[stat] for api, stats in rate_limiter.stats().items()}, ["api"]
+    )
+scans_rejected = metrics.counter(
+    "scan_rejected_total", "Scan requests refused with a 503 because the queue or the waiting requests were full.",
+    ["entity"]
+)
+metrics.callback(
+    "raw_output_files_total", "counter", "Raw tool files archived, by whether their content was new or already stored.",
+    lambda: {("stored",): blob_store.stats()["stored"], ("deduplicated",): blob_store.stats()["deduplicated"]}
+    if blob_store else {}, ["outcome"]
+)
+metrics.callback(
+    "raw_output_bytes_total", "counter", "Raw tool output bytes archived, before and after deduplication and compression.",
+    lambda: {("in",): blob_store.stats()["bytes_in"], ("written",): blob_store.stats()["bytes_written"]}
+    if blob_store else {}, ["kind"]
+)
+result_views = metrics.counter(
+    "result_view_responses_total", "Responses of the /results endpoint (304 when the client copy was current).",
+    ["entity", "status"]
+)
+metrics.callback(
+    "scan_duplicates_avoided_total", "counter",
+    "Scan requests that joined an identical in-flight scan instead of starting another.",
+    lambda: {(entity,): count for entity, count in job_queue.coalesced.items()}, ["entity"]
+)
+metrics.callback(
+    "scan_queue_depth", "gauge", "Scan jobs waiting for a worker.",
+    lambda: {(entity,): depth for entity, depth in job_queue.queue_depth().items()}, ["entity"]
+)
+for stat, metric_type in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge")):
+    metrics.callback(
+        f"result_cache_{stat}" + ("_total" if metric_type == "counter" else ""), metric_type,
+        f"Result cache {stat}.", lambda stat=stat: {(): result_cache.stats()[stat]}
+    )
+
+
+# Refuse a scan when the server is saturated, saying when to come back
+def overloaded_response(error):
+    scans_rejected.inc(entity=error.entity)
+    response = jsonify({"error": str(error), "retry_after": error.retry_after})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
+
+
+# Take a slot for a request that will hold its thread on a scan, or raise QueueFull
+def hold_waiting_slot(entity):
+    if not waiting_requests.acquire(blocking=False):
+        raise QueueFull(entity, job_queue.retry_after(entity))
+
+
+# Submit a scan and block until it finishes, refusing when the server is saturated.
+# Returns (job_id, result, partial): partial is "deadline" when the caller joined a
+# scan with a later deadline and its own passed first. It then gets the tool output
+# collected so far, and the scan goes on for its other callers.
+def wait_for_scan(entity, input_value, deadline, **options):
+    hold_waiting_slot(entity)
+    try:
+        job_id = job_queue.submit(entity, input_value, bounded=True, deadline=deadline, **options)
+        job_deadline = job_queue.get(job_id)["options"].get("deadline")
+        timeout = max(0.0, deadline - time.time()) if job_deadline and job_deadline > deadline else None
+        try:
+            return job_id, job_queue.wait(job_id, timeout=timeout), None
+        except FutureTimeout:
+            job_queue.release(job_id)
+            workspace = job_workspace(entity, job_id)
+            return job_id, partial_scan_result(entity, input_value, job_id, workspace, options.get("raw")), "deadline"
+    finally:
+        waiting_requests.release()
+
+
+# Format one Server-Sent Events message
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Watchers of the job workspaces being streamed, by job id. The scan settles them
+# before it removes the workspace, so output written just before the tools exit
+# is still sent.
+workspace_watchers = {}
+workspace_watchers_lock = threading.Lock()
+
+
+def settle_workspace_watchers(job_id):
+    with workspace_watchers_lock:
+        watchers = list(workspace_watchers.get(job_id, []))
+    for watcher in watchers:
+        watcher.settle()
+
+
+# Yield each tool's parsed output as it lands in the job workspace, then the merged result
+def stream_job_events(job_id):
+    job = job_queue.get(job_id)
+    details = DOCKER_CONTAINERS[job["entity"]]
+    watcher = WorkspaceWatcher(
+        job_workspace(job["entity"], job_id), skip=[details["output_file"](job["input"])]
+    )
+    with workspace_watchers_lock:
+        workspace_watchers.setdefault(job_id, []).append(watcher)
+    try:
+        yield sse_event("job", {"job_id": job_id, "entity": job["entity"], "input": job["input"]})
+
+        last_sent = time.monotonic()
+        while True:
+            job = job_queue.get(job_id)
+            finished = job is None or job["status"] in ("done", "failed", "cancelled")
+            for name, data in watcher.poll():
+                yield sse_event("tool_result", {"file": name, "data": data})
+                last_sent = time.monotonic()
+            if finished:
+                break
+            if time.monotonic() - last_sent > STREAM_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_INTERVAL)
+    finally:
+        with workspace_watchers_lock:
+            workspace_watchers[job_id].remove(watcher)
+            if not workspace_watchers[job_id]:
+                del workspace_watchers[job_id]
+
+    if job is None:
+        yield sse_event("error", {"error": "Job expired"})
+    elif job["result"] is not None:
+        if job.get("partial"):
+            yield sse_event("partial", {"status": job["status"], "timings": job["timings"]})
+        yield sse_event("result", job["result"])
+    else:
+        yield sse_event("error", {"error": job["error"]})
+
+
+# Stream a kept merged file to the client in chunks, then delete it. Gzip files
+# go out unchanged when the client accepts gzip and are inflated on the fly otherwise.
+def raw_output_response(raw_output):
+    path = raw_output["output_path"]
+    send_compressed = raw_output["gzip"] and "gzip" in request.accept_encodings
+
+    def remove_output():
+        if os.path.exists(path):
+            os.remove(path)
+
+    def chunks():
+        opener = gzip.open if raw_output["gzip"] and not send_compressed else open
+        try:
+            with opener(path, "rb") as output_file:
+                while True:
+                    chunk = output_file.read(65536)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            remove_output()
+
+    headers = {"Vary": "Accept-Encoding"}
+    if send_compressed:
+        headers["Content-Encoding"] = "gzip"
+    response = Response(chunks(), mimetype="application/json", headers=headers)
+    # Also on close: the generator's finally never runs if the client leaves before the first chunk
+    response.call_on_close(remove_output)
+    return response
+
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events), mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Why a partial scan stopped short: "cancelled", "deadline" or "rate_limited"
+def partial_reason(timings):
+    if timings.get("partial"):
+        return timings["partial"]
+    statuses = {tool.get("status") for tool in timings.get("tools", [])}
+    if timings.get("rate_limited_tools") or ("rate_limited" in statuses and "deadline" not in statuses):
+        return "rate_limited"
+    return "deadline"
+
+
+# Flag responses carrying partial results (deadline passed, scan cancelled or out of API quota)
+def partial_headers(response, job_id, partial=None):
+    job = job_queue.get(job_id)
+    if partial:
+        response.headers["X-Scan-Partial"] = partial
+    elif job and job.get("partial"):
+        response.headers["X-Scan-Partial"] = partial_reason(job["timings"])
+    return response
+
+
+# Serve the HTML file
+@app.route("/")
+def serve_index():
+    return send_from_directory(SITE_DIR, "index.html")
+
+# Serve the result pages and their assets, so they call the API on the same origin
+@app.route("/<page>.html")
+def serve_page(page):
+    if page not in SITE_PAGES:
+        return jsonify({"error": "Page not found"}), 404
+    return send_from_directory(SITE_DIR, f"{page}.html")
+
+@app.route("/assets/<path:name>")
+def serve_asset(name):
+    return send_from_directory(os.path.join(SITE_DIR, "assets"), name)
+
+# Let the pages call the API when another static server serves them
+@app.after_request
+def allow_site_origins(response):
+    origin = request.headers.get("Origin")
+    if origin in CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, DELETE"
+        response.headers["Access-Control-Expose-Headers"] = "ETag, Retry-After, X-Result-Totals, X-Scan-Partial"
+        response.vary.add("Origin")
+    return response
+
+# Endpoint to fetch entity data
+@app.route("/fetch-entity-data", methods=["POST"])
+def fetch_entity_data():
+    try:
+        # Parse request JSON
+        data = request.get_json(silent=True)
+        entity, input_value = parse_scan_request(data)
+
+        deadline = parse_deadline(data)
+
+        # Pass the merged file straight through instead of parsing it here
+        if data.get("stream"):
+            job_id, raw_output, partial = wait_for_scan(entity, input_value, deadline, raw=True)
+            return partial_headers(raw_output_response(raw_output), job_id, partial)
+
+        # Serve repeated lookups from the cache unless a refresh was requested
+        if not wants_refresh(data):
+            cached = result_cache.get(entity, input_value)
+            if cached is not None:
+                return jsonify(cached)
+
+        # Run on the entity's worker pool so concurrent scans stay bounded,
+        # joining a scan of the same target that is already under way
+        full = wants_full_rescan(data)
+        job_id, output_data, partial = wait_for_scan(
+            entity, input_value, deadline, coalesce_key=scan_key(entity, input_value, full), full=full
+        )
+
+        return partial_headers(jsonify(output_data), job_id, partial)
+
+    except ScanError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except QueueFull as e:
+        return overloaded_response(e)
+    except CancelledError:
+        return jsonify({"error": "Scan cancelled"}), 409
     except Exception as e:
         # General error handling
         print(f"Unexpected error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Submit a scan without waiting for it; poll /jobs/<job_id> for the result
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    data = request.get_json(silent=True)
+    try:
+        entity, input_value = parse_scan_request(data)
+        deadline = parse_deadline(data)
+    except ScanError as e:
+        return jsonify({"error": str(e)}), e.status_code
+
+    if not wants_refresh(data):
+        cached = result_cache.get(entity, input_value)
+        if cached is not None:
+            return jsonify({"job_id": None, "status": "done", "cached": True, "result": cached})
+
+    full = wants_full_rescan(data)
+    try:
+        job_id = job_queue.submit(
+            entity, input_value, coalesce_key=scan_key(entity, input_value, full), bounded=True,
+            deadline=deadline, full=full
+        )
+    except QueueFull as e:
+        return overloaded_response(e)
+    status = job_queue.get(job_id)["status"]
+    return jsonify({"job_id": job_id, "status": status, "status_url": f"/jobs/{job_id}"}), 202
+
+# Start a scan and stream each tool's result as Server-Sent Events as soon as it is ready.
+# Takes the same fields as /fetch-entity-data, as query parameters so EventSource can use it.
+@app.route("/stream-entity-data", methods=["GET"])
+def stream_entity_data():
+    data = request.args.to_dict()
+    try:
+        entity, input_value = parse_scan_request(data)
+        deadline = parse_deadline(data)
+    except ScanError as e:
+        return jsonify({"error": str(e)}), e.status_code
+
+    if not wants_refresh(data):
+        cached = result_cache.get(entity, input_value)
+        if cached is not None:
+            return sse_response(iter([sse_event("result", cached)]))
+
+    # Stopped when the client disconnects, unless other callers share the job.
+    # The stream holds its thread until the scan ends, like a blocking lookup.
+    full = wants_full_rescan(data)
+    try:
+        hold_waiting_slot(entity)
+    except QueueFull as e:
+        return overloaded_response(e)
+    try:
+        job_id = job_queue.submit(
+            entity, input_value, coalesce_key=scan_key(entity, input_value, full), bounded=True,
+            deadline=deadline, full=full
+        )
+    except QueueFull as e:
+        waiting_requests.release()
+        return overloaded_response(e)
+    response = sse_response(stream_job_events(job_id))
+    # Runs even when the client leaves before the first event, which the generator would miss
+    response.call_on_close(lambda: job_queue.release(job_id))
+    response.call_on_close(waiting_requests.release)
+    return response
+
+# Stream the partial results of an already submitted scan
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return sse_response(stream_job_events(job_id))
+
+# Scan many inputs at once. Takes {"entity": ..., "inputValues": [...]} and/or
+# {"items": [{"entity": ..., "inputValue": ...}, ...]}; inputs are normalized
+# and deduplicated, and cached results are used unless "refresh" is set.
+@app.route("/batches", methods=["POST"])
+def submit_batch():
+    data = request.get_json(silent=True) or {}
+    requested = [{"entity": data.get("entity"), "inputValue": value} for value in data.get("inputValues") or []]
+    requested += data.get("items") or []
+    if not requested:
+        return jsonify({"error": "inputValues or items are required"}), 400
+    if len(requested) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"A batch holds at most {BATCH_MAX_ITEMS} inputs"}), 400
+
+    items = []
+    for entry in requested:
+        try:
+            items.append(parse_scan_request(entry))
+        except ScanError as e:
+            return jsonify({"error": f"{e} ({entry})"}), e.status_code
+        # Grouped runs pass inputs comma separated, so keep commas out of them
+        if "," in items[-1][1]:
+            return jsonify({"error": f"Invalid input value ({entry})"}), 400
+
+    lookup_cached = None if wants_refresh(data) else result_cache.get
+    batch_id = batch_scheduler.create(items, lookup_cached=lookup_cached, full=wants_full_rescan(data))
+    summary = batch_scheduler.get(batch_id, include_results=False)
+    return jsonify({"batch_id": batch_id, "status_url": f"/batches/{batch_id}", **summary}), 202
+
+# Progress of a batch; add ?results=0 to leave the per-input results out
+@app.route("/batches/<batch_id>", methods=["GET"])
+def get_batch(batch_id):
+    include_results = request.args.get("results", "1").lower() not in ("0", "false", "no")
+    batch = batch_scheduler.get(batch_id, include_results=include_results)
+    if batch is None:
+        return jsonify({"error": "Unknown batch id"}), 404
+    return jsonify(batch)
+
+# Scan a target and follow what it leads to: an email's local part as a username,
+# and phone numbers found in email and username results. Takes the fields of
+# /fetch-entity-data plus an optional "depth"; poll /pivots/<pivot_id> for the graph.
+@app.route("/pivots", methods=["POST"])
+def submit_pivot():
+    data = request.get_json(silent=True)
+    try:
+        entity, input_value = parse_scan_request(data)
+        depth = int(data.get("depth", PIVOT_MAX_DEPTH))
+    except ScanError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except (TypeError, ValueError):
+        return jsonify({"error": "depth must be an integer"}), 400
+
+    lookup_cached = None if wants_refresh(data) else result_cache.get
+    pivot_id = pivot_orchestrator.create(
+        entity, input_value, depth=max(0, depth), lookup_cached=lookup_cached, full=wants_full_rescan(data)
+    )
+    summary = pivot_orchestrator.get(pivot_id, include_results=False)
+    return jsonify({"pivot_id": pivot_id, "status_url": f"/pivots/{pivot_id}", **summary}), 202
+
+# The combined result graph of a pivot; add ?results=0 to leave the per-node results out
+@app.route("/pivots/<pivot_id>", methods=["GET"])
+def get_pivot(pivot_id):
+    include_results = request.args.get("results", "1").lower() not in ("0", "false", "no")
+    pivot = pivot_orchestrator.get(pivot_id, include_results=include_results)
+    if pivot is None:
+        return jsonify({"error": "Unknown pivot id"}), 404
+    return jsonify(pivot)
+
+# Report the status of a submitted scan, including its result once done
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job)
+
+# The raw tool files a job's scan produced: {path: {"sha256", "size"}}
+@app.route("/jobs/<job_id>/raw", methods=["GET"])
+def get_raw_outputs(job_id):
+    manifest = blob_store.manifest(job_id) if blob_store and job_id.isalnum() else None
+    if manifest is None:
+        return jsonify({"error": "No raw outputs kept for this job"}), 404
+    return jsonify(manifest)
+
+# One raw tool file of a job, as the tool wrote it
+@app.route("/jobs/<job_id>/raw/<path:name>", methods=["GET"])
+def get_raw_output(job_id, name):
+    manifest = blob_store.manifest(job_id) if blob_store and job_id.isalnum() else None
+    entry = manifest["files"].get(name) if manifest else None
+    data = blob_store.read(entry["sha256"]) if entry else None
+    if data is None:
+        return jsonify({"error": "No such raw output for this job"}), 404
+    mimetype = "application/json" if name.endswith(".json") else "text/plain"
+    return Response(data, mimetype=mimetype, headers={"ETag": f'"{entry["sha256"]}"'})
+
+# Take a token for an upstream API, waiting up to ?wait= seconds (at most 30).
+# Called by the container scripts before a tool uses a shared API key.
+@app.route("/rate-limit/<api>/acquire", methods=["POST"])
+def acquire_rate_limit(api):
+    if api not in rate_limiter.buckets:
+        return jsonify({"error": f"Unknown API '{api}'"}), 404
+    try:
+        wait = min(float(request.args.get("wait", "0")), 30.0)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    granted, retry_after = rate_limiter.acquire(api, timeout=wait)
+    if granted:
+        return jsonify({"granted": True})
+    response = jsonify({
+        "granted": False, "retry_after": round(retry_after, 1), "quota_exhausted": rate_limiter.quota_exhausted(api)
+    })
+    response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+# Token bucket levels and quota used today per upstream API
+@app.route("/rate-limit", methods=["GET"])
+def rate_limit_stats():
+    return jsonify(rate_limiter.stats())
+
+# Cancel a scan: a queued one never starts, a running one has its container killed
+# and keeps the partial results collected so far
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({"error": "Job already finished"}), 409
+    status = "cancelled" if job_queue.get(job_id)["status"] == "cancelled" else "cancelling"
+    return jsonify({"job_id": job_id, "status": status, "status_url": f"/jobs/{job_id}"}), 202
+
+# Warm container pool occupancy and recycle counts
+@app.route("/pool/stats", methods=["GET"])
+def pool_stats():
+    return jsonify({entity: pool.stats() for entity, pool in warm_pools.items()})
+
+# Query findings across every recorded scan, e.g. /results/search?site=GitHub&entity=username
+@app.route("/results/search", methods=["GET"])
+def search_results():
+    if not result_store:
+        return jsonify({"error": "Result store is disabled"}), 404
+    try:
+        limit = min(int(request.args.get("limit", "100")), 1000)
+        offset = int(request.args.get("offset", "0"))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    filters = {key: request.args.get(key) for key in ("site", "breach", "target", "tool", "entity")}
+    if filters["target"] and filters["entity"]:
+        try:
+            filters["target"] = normalize_input(filters["entity"], filters["target"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    findings = result_store.query(limit=limit, offset=offset, **filters)
+    return jsonify({"findings": findings, "count": len(findings), "limit": limit, "offset": offset})
+
+# Latest result of a target without scanning it: (result, version), or None.
+# The version changes whenever the result does and goes into the ETag.
+def stored_result(entity, input_value):
+    # Page views must not skew the cache statistics of scan lookups
+    cached = result_cache.peek(entity, input_value)
+    if cached is not None:
+        result, cached_at = cached
+        return result, ["cache", cached_at]
+    if result_store:
+        stored = result_store.tool_outputs(entity, input_value)
+        if stored:
+            fragments = {tool: output["data"] for tool, output in stored.items()}
+            version = max(output["scanned_at"] for output in stored.values())
+            return merge_tool_outputs(entity, input_value, fragments), ["store", version]
+    return None
+
+
+# A comma separated query parameter as a list
+def list_arg(name):
+    return [value for value in request.args.get(name, "").split(",") if value]
+
+
+# The latest result of a target, for the result pages. Supports:
+#   ?tools=a,b        only these tools' output
+#   ?fields=a,b       only these keys of each record in the per-tool arrays
+#   ?limit=&offset=   one page of each per-tool array; totals in X-Result-Totals
+# Responses carry an ETag (If-None-Match gives 304) and are br/gzip compressed when accepted.
+@app.route("/results/<entity>/<path:input_value>", methods=["GET"])
+def get_result(entity, input_value):
+    if entity not in DOCKER_CONTAINERS:
+        return jsonify({"error": "Invalid entity selected"}), 400
+    try:
+        input_value = normalize_input(entity, input_value)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    tools = list_arg("tools")
+    unknown = [tool for tool in tools if tool not in TOOL_FRESHNESS[entity]]
+    if unknown:
+        return jsonify({"error": f"Unknown tools: {', '.join(unknown)}"}), 400
+    fields = list_arg("fields")
+    try:
+        limit = min(int(request.args["limit"]), RESULT_PAGE_MAX) if "limit" in request.args else None
+        offset = int(request.args.get("offset", "0"))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({"error": "limit and offset must not be negative"}), 400
+
+    stored = stored_result(entity, input_value)
+    if stored is None:
+        return jsonify({"error": "No result for this input; run a scan first"}), 404
+    result, version = stored
+
+    # Answer revalidations before rendering anything
+    etag = result_etag(entity, input_value, version, [sorted(tools), sorted(fields), limit, offset])
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        result_views.inc(entity=entity, status="304")
+        return Response(status=304, headers=headers)
+
+    def render():
+        view = select_tools(entity, input_value, result, tools) if tools else result
+        view, totals = shape_result(view, fields=fields, offset=offset, limit=limit)
+        extra = {}
+        if limit is not None or offset:
+            extra["X-Result-Totals"] = json.dumps(totals)
+        return json.dumps(view).encode(), extra
+
+    encoding = request.accept_encodings.best_match(supported_encodings(), default="identity")
+    body, extra = rendered_views.get(etag, encoding, render)
+    headers.update(extra)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    result_views.inc(entity=entity, status="200")
+    return Response(body, mimetype="application/json", headers=headers)
+
+# Cache hit/miss counters and occupancy
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+# Scan latency, queue depth, failures and cache counters in Prometheus text format
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Run the app: the Werkzeug dev server by default, waitress with SERVE_MODE=production
+def serve():
+    if SERVE_MODE != "production":
+        app.run(debug=True)
+        return
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        raise SystemExit(
+            "SERVE_MODE=production needs waitress (pip install waitress); "
+            "or run gunicorn -c gunicorn.conf.py app:app"
+        )
+    # Fill the warm pools now rather than on the first request
+    get_warm_pool("email")
+    # Exit normally on SIGTERM so atexit removes the warm containers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on {HOST}:{PORT} with {WEB_THREADS} threads")
+    waitress_serve(app, host=HOST, port=PORT, threads=WEB_THREADS, backlog=WEB_THREADS * 2)
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    serve()
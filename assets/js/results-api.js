@@ -0,0 +1,39 @@
+// Loads scan results from the Flask API for the result pages.
+// Flask serves these pages itself, and the API is then on the same origin. When
+// they are opened from another static server (Live Server on :5501) or from disk,
+// the API origin is taken from ?api=, from localStorage "apiBase", or defaults
+// to http://127.0.0.1:5000.
+const RESULTS_API_BASE = (() => {
+    const configured = new URLSearchParams(window.location.search).get('api') || localStorage.getItem('apiBase');
+    if (configured) {
+        return configured.replace(/\/$/, '');
+    }
+    const servedByFlask = window.location.protocol !== 'file:' && window.location.port !== '5501';
+    return servedByFlask ? '' : 'http://127.0.0.1:5000';
+})();
+
+// The latest stored result of a target. When nothing is stored yet, a scan is run
+// first; query (e.g. "tools=blackbird&fields=name,url") trims the stored result.
+async function loadResult(entity, inputValue, query = '') {
+    const url = `${RESULTS_API_BASE}/results/${entity}/${encodeURIComponent(inputValue)}${query ? `?${query}` : ''}`;
+    let response = await fetch(url);
+    if (response.status === 404) {
+        const scan = await fetch(`${RESULTS_API_BASE}/fetch-entity-data`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ entity, inputValue })
+        });
+        if (!scan.ok) {
+            throw new Error(`Scan failed with HTTP status ${scan.status}`);
+        }
+        response = await fetch(url);
+        // Partial scans are not stored; show what the scan returned
+        if (response.status === 404) {
+            return scan.json();
+        }
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+    }
+    return response.json();
+}
@@ -0,0 +1,154 @@
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class BatchScheduler:
+    """Feed batch scans to the job queue fairly.
+
+    Batch jobs in flight per entity are capped at that entity's worker count, so
+    single lookups never queue behind a whole batch, and free slots go to the
+    batches round-robin. Entities with a group size above one hand several
+    inputs to a single job.
+    """
+
+    def __init__(self, job_queue, capacity, group_sizes=None, retention=3600, coalesce_key=None):
+        self.job_queue = job_queue
+        self.capacity = capacity
+        self.group_sizes = group_sizes or {}
+        self.retention = retention
+        # Lets batch scans join identical scans already under way, from lookups or other batches
+        self.coalesce_key = coalesce_key
+        self.batches = {}
+        self.in_flight = {entity: 0 for entity in capacity}
+        self.rotation = {entity: deque() for entity in capacity}  # batch ids with pending work
+        self.lock = threading.Lock()
+
+    def create(self, items, lookup_cached=None, full=False):
+        """Start a batch of (entity, normalized input) items and return its id.
+
+        With full, every tool is rerun instead of reusing fresh stored output.
+        """
+        batch_id = uuid.uuid4().hex
+        batch = {
+            "id": batch_id,
+            "full": full,
+            "created_at": time.time(),
+            "finished_at": None,
+            "duplicates": 0,
+            "items": {},
+            "pending": {},
+        }
+        for entity, input_value in items:
+            key = f"{entity}:{input_value}"
+            if key in batch["items"]:
+                batch["duplicates"] += 1
+                continue
+            item = {"entity": entity, "input": input_value, "status": "pending",
+                    "job_id": None, "cached": False, "result": None, "error": None}
+            cached = lookup_cached(entity, input_value) if lookup_cached else None
+            if cached is not None:
+                item.update(status="done", cached=True, result=cached)
+            else:
+                batch["pending"].setdefault(entity, deque()).append(key)
+            batch["items"][key] = item
+
+        with self.lock:
+            self._prune()
+            self.batches[batch_id] = batch
+            for entity in batch["pending"]:
+                self.rotation[entity].append(batch_id)
+            self._check_finished(batch)
+        for entity in list(batch["pending"]):
+            self._dispatch(entity)
+        return batch_id
+
+    def _dispatch(self, entity):
+        # Fill free batch slots for an entity, one group per batch in turn
+        submissions = []
+        with self.lock:
+            rotation = self.rotation[entity]
+            while rotation and self.in_flight[entity] < self.capacity[entity]:
+                batch = self.batches.get(rotation.popleft())
+                pending = batch["pending"].get(entity) if batch else None
+                if not pending:
+                    continue
+                keys = [pending.popleft() for _ in range(min(self.group_sizes.get(entity, 1), len(pending)))]
+                if pending:
+                    rotation.append(batch["id"])  # Back of the line for its next group
+                for key in keys:
+                    batch["items"][key]["status"] = "queued"
+                self.in_flight[entity] += 1
+                submissions.append((batch, keys))
+
+        for batch, keys in submissions:
+            items = [batch["items"][key] for key in keys]
+            if len(items) == 1:
+                coalesce_key = (
+                    self.coalesce_key(entity, items[0]["input"], batch["full"]) if self.coalesce_key else None
+                )
+                job_id = self.job_queue.submit(entity, items[0]["input"], coalesce_key=coalesce_key, full=batch["full"])
+            else:
+                group = [item["input"] for item in items]
+                # Keyed on the inputs as a tuple, so a group never joins a single-input scan
+                coalesce_key = self.coalesce_key(entity, tuple(sorted(group))) if self.coalesce_key else None
+                job_id = self.job_queue.submit(entity, ",".join(group), coalesce_key=coalesce_key, group=group)
+            for item in items:
+                item["job_id"] = job_id
+            self.job_queue.add_done_callback(
+                job_id, lambda job, batch=batch, keys=keys: self._finished(entity, batch, keys, job)
+            )
+
+    def _finished(self, entity, batch, keys, job):
+        with self.lock:
+            for key in keys:
+                item = batch["items"][key]
+                if job["status"] != "done":
+                    item.update(status="failed", error=job["error"])
+                elif len(keys) > 1:
+                    # Grouped jobs return {input: result or None}
+                    result = job["result"].get(item["input"])
+                    if result is None:
+                        item.update(status="failed", error="No output for this input")
+                    else:
+                        item.update(status="done", result=result)
+                else:
+                    item.update(status="done", result=job["result"])
+            self.in_flight[entity] -= 1
+            self._check_finished(batch)
+        self._dispatch(entity)
+
+    def _check_finished(self, batch):
+        if all(item["status"] in ("done", "failed") for item in batch["items"].values()):
+            batch["finished_at"] = batch["finished_at"] or time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for batch_id in [batch_id for batch_id, batch in self.batches.items()
+                         if batch["finished_at"] and batch["finished_at"] < cutoff]:
+            del self.batches[batch_id]
+
+    def get(self, batch_id, include_results=True):
+        """Return progress counts and per-item status (and results) for a batch."""
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            counts = {"pending": 0, "queued": 0, "done": 0, "failed": 0}
+            items = []
+            for item in batch["items"].values():
+                counts[item["status"]] += 1
+                item = dict(item)
+                if not include_results:
+                    item.pop("result")
+                items.append(item)
+            return {
+                "id": batch_id,
+                "created_at": batch["created_at"],
+                "finished_at": batch["finished_at"],
+                "total": len(items),
+                "duplicates": batch["duplicates"],
+                "progress": counts,
+                "items": items,
+            }
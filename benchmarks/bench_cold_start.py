@@ -0,0 +1,119 @@
+"""Benchmark cold-start time of the tool images, standard build against Dockerfile.fast.
+
+For each image a fresh container is started the way app.py starts one (a job
+folder mounted at /app/jobs and handed over as OUTPUT_DIR) and the job folder
+is watched. Reported per image, as the median over --repeat runs:
+
+    started       docker run -d returned (container created and started)
+    first output  the first tool output file in the job folder is non-empty
+    finished      the container exited (only with --full)
+
+Needs Docker and the images built, e.g. for email-setup:
+
+    docker build -t email-setup email-setup
+    docker build -f email-setup/Dockerfile.fast -t email-setup:fast email-setup
+    python benchmarks/bench_cold_start.py --images email=email-setup email=email-setup:fast
+"""
+import os
+import sys
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# Input handed to each entity's image, and the variable it goes in
+ENTITY_INPUTS = {
+    "email": ("EMAIL", "rhythmtom29@gmail.com"),
+    "phone": ("PHONE_NUMBER", "+919773481532"),
+    "username": ("USERNAME", "rudra7404"),
+}
+
+DEFAULT_IMAGES = [
+    "email=email-setup", "email=email-setup:fast",
+    "phone=phoneinfo-tool", "phone=phoneinfo-tool:fast",
+    "username=username-setup", "username=username-setup:fast",
+]
+
+
+# First non-empty tool output in the job folder ("_" files are status files)
+def has_output(job_dir):
+    for root, _, files in os.walk(job_dir):
+        for name in files:
+            if not name.startswith("_") and os.path.getsize(os.path.join(root, name)) > 0:
+                return True
+    return False
+
+
+def container_running(name):
+    result = subprocess.run(
+        ["docker", "inspect", "-f", "{{.State.Running}}", name], capture_output=True, text=True
+    )
+    return result.stdout.strip() == "true"
+
+
+def cold_start(entity, image, full, timeout):
+    """Start one container and return (started, first output, finished) in seconds."""
+    env_var, value = ENTITY_INPUTS[entity]
+    jobs_dir = tempfile.mkdtemp(prefix="cold-start-")
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(jobs_dir, job_id))
+    name = f"cold-start-{job_id[:12]}"
+    began = time.perf_counter()
+    try:
+        subprocess.run(
+            ["docker", "run", "-d", "--name", name, "-e", f"OUTPUT_DIR=/app/jobs/{job_id}",
+             "-e", f"{env_var}={value}", "-v", f"{jobs_dir}:/app/jobs", image],
+            check=True, capture_output=True, text=True
+        )
+        started = time.perf_counter() - began
+        first_output = finished = None
+        while time.perf_counter() - began < timeout:
+            if first_output is None and has_output(os.path.join(jobs_dir, job_id)):
+                first_output = time.perf_counter() - began
+                if not full:
+                    break
+            if not container_running(name):
+                finished = time.perf_counter() - began
+                break
+            time.sleep(0.05)
+        return started, first_output, finished
+    finally:
+        subprocess.run(["docker", "rm", "-f", name], capture_output=True, text=True)
+        # Files written by root inside the container may need docker to remove them
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return f"{statistics.median(values):.2f}s" if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", nargs="+", default=DEFAULT_IMAGES, help="entity=image pairs to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per image (the median is reported)")
+    parser.add_argument("--full", action="store_true", help="Wait for the whole scan instead of the first output")
+    parser.add_argument("--timeout", type=float, default=600, help="Give up on a run after this many seconds")
+    args = parser.parse_args()
+
+    if shutil.which("docker") is None:
+        sys.exit("docker is not available")
+
+    print(f"{'image':<32} {'started':>9} {'first output':>13} {'finished':>9}")
+    for pair in args.images:
+        entity, _, image = pair.partition("=")
+        if entity not in ENTITY_INPUTS or not image:
+            sys.exit(f"Expected entity=image with entity one of {', '.join(ENTITY_INPUTS)}, got {pair}")
+        if subprocess.run(["docker", "image", "inspect", image], capture_output=True).returncode != 0:
+            print(f"{image:<32} not built, skipped")
+            continue
+        runs = [cold_start(entity, image, args.full, args.timeout) for _ in range(args.repeat)]
+        started, first_output, finished = zip(*runs)
+        print(f"{image:<32} {median(started):>9} {median(first_output):>13} {median(finished):>9}")
+
+
+if __name__ == "__main__":
+    main()
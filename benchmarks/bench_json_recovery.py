@@ -0,0 +1,126 @@
+"""Benchmark recovery of concatenated / newline-delimited JSON in email-setup/final_op2.py.
+
+Generates breach-dump style inputs of a few MB and times clean_malformed_json
+against the previous implementation, which re-parsed a growing buffer after
+every line. Also reports the parser's peak memory, which must stay bounded by
+the largest document, including when a malformed line starts the file.
+
+    python benchmarks/bench_json_recovery.py [--sizes 1 4 16]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "email-setup"))
+from final_op2 import clean_malformed_json, iter_json_documents  # noqa: E402
+
+# Peak memory allowed while streaming any input; the documents here are at most ~60KB
+PEAK_LIMIT_MB = 4
+
+
+# The implementation clean_malformed_json replaced, kept for comparison
+def legacy_clean_malformed_json(file_path):
+    corrected_data = []
+    with open(file_path, mode='r', encoding='utf-8') as json_file:
+        buffer = ""
+        for line in json_file:
+            buffer += line.strip()
+            try:
+                parsed = json.loads(buffer)
+                corrected_data.append(parsed)
+                buffer = ""
+            except json.JSONDecodeError:
+                pass
+    return corrected_data
+
+
+# A record shaped like the BreachCheck / mailleaks output
+def make_record(rng, index):
+    return {
+        "email": f"user{index}@example.com",
+        "hash_password": rng.random() < 0.5,
+        "password": "x" * rng.randint(4, 16),
+        "sha1": "%040x" % rng.getrandbits(160),
+        "sources": rng.choice(["Stealer Logs", "Gemini.com", "NazApi", "Canva"]),
+    }
+
+
+# Write about size_mb of JSON in the given layout and return the record count.
+# "malformed" is ndjson whose first line is broken and must be skipped.
+def write_input(path, size_mb, layout, seed=0):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        if layout == "malformed":
+            f.write('{"email": "broken@example.com", "sources": \n')
+        while written < target:
+            if layout in ("ndjson", "malformed"):
+                text = json.dumps(make_record(rng, count)) + "\n"
+            elif layout == "pretty":
+                text = json.dumps(make_record(rng, count), indent=4) + "\n"
+            else:  # One large pretty-printed document holding many records
+                text = json.dumps({"found": 200, "result": [make_record(rng, count + i) for i in range(200)]}, indent=4) + "\n"
+            f.write(text)
+            written += len(text)
+            count += 1
+    return count
+
+
+def time_call(func, path):
+    started = time.perf_counter()
+    documents = func(path)
+    return time.perf_counter() - started, documents
+
+
+# Peak memory in MB of streaming a file's documents without keeping them
+def peak_mb(path):
+    tracemalloc.start()
+    try:
+        with open(path, encoding="utf-8") as json_file:
+            for _ in iter_json_documents(json_file):
+                pass
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="Input sizes in MB")
+    parser.add_argument("--legacy-max-mb", type=float, default=4, help="Skip the quadratic legacy parser above this size")
+    args = parser.parse_args()
+
+    print(f"{'layout':<9} {'MB':>6} {'docs':>8} {'new s':>8} {'new MB/s':>9} {'peak MB':>8} {'legacy s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("ndjson", "pretty", "large", "malformed"):
+            for size_mb in args.sizes:
+                path = os.path.join(tmp, f"{layout}_{size_mb}.json")
+                expected = write_input(path, size_mb, layout)
+                actual_mb = os.path.getsize(path) / (1024 * 1024)
+
+                elapsed, documents = time_call(clean_malformed_json, path)
+                assert len(documents) == expected, (layout, len(documents), expected)
+                peak = peak_mb(path)
+                assert peak < PEAK_LIMIT_MB, (layout, size_mb, f"peak {peak:.1f} MB")
+
+                legacy = "-"
+                speedup = "-"
+                if size_mb <= args.legacy_max_mb:
+                    legacy_elapsed, legacy_documents = time_call(legacy_clean_malformed_json, path)
+                    # The legacy parser never recovers from a broken first line
+                    assert legacy_documents == documents or layout == "malformed"
+                    legacy = f"{legacy_elapsed:.3f}"
+                    speedup = f"{legacy_elapsed / elapsed:.1f}x"
+
+                print(f"{layout:<9} {actual_mb:>6.1f} {len(documents):>8} {elapsed:>8.3f} "
+                      f"{actual_mb / elapsed:>9.1f} {peak:>8.1f} {legacy:>9} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
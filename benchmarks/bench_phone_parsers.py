@@ -0,0 +1,139 @@
+"""Benchmark the phone output parsers in phoneinfo-setup/phone_parsers.py.
+
+Rebuilds raw phoneinfoga / Phunter text reports (banner, ANSI colours, box
+drawing) from the recorded +919773481532.json, checks that the shared parser
+gives the same sections as the previous per-call implementation and times both.
+
+    python benchmarks/bench_phone_parsers.py [--scales 1 10 100] [--repeat 20]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "phoneinfo-setup"))
+from phone_parsers import PARSERS  # noqa: E402
+
+RECORDED_RESULT = os.path.join(ROOT, "+919773481532.json")
+
+PHUNTER_BANNER = [
+    "      ____  __                __",
+    "     / __ \\/ /_  __  ______  / /____  _____",
+    "(    )",
+    "`-.-' \\ )-`( , o o)",
+    "`-    \\`_`\"'-",
+    "`-(-'",
+    ":::::::::::::::::::::::::::::::::::",
+]
+
+
+# The implementation phone_parsers replaced, kept for comparison
+def legacy_clean_ansi_sequences(text):
+    ansi_escape = re.compile(r'\x1B[@-_][0-?]*[ -/]*[@-~]')
+    return ansi_escape.sub('', text)
+
+
+def legacy_replace_unicode_symbols(line):
+    replacements = {
+        "\u251c\u2500\u2500": "-->",
+        "\u2514\u2500\u2500": "-->",
+        "\u2714": "Valid",
+        "\ud83d\udcde": "Phone Number:",
+        "\ufe0f": "",
+    }
+    for unicode_char, replacement in replacements.items():
+        line = line.replace(unicode_char, replacement)
+    return line
+
+
+def legacy_filter_unwanted_data(lines):
+    filtered_lines = []
+    unwanted_patterns = [
+        r'^\s*[_]+',
+        r'^\s*[\(\)]',
+        r'^`-.-\' \\\)\\-\`\\( , o o\\)',
+        r'^`-    \\\`_`\"\'-',
+        r'^`-\(-\'$',
+        r'by Norze',
+        r'^\|\s*Phone number OSINT Tool\s*\|$',
+        r'^:.*:$'
+    ]
+    regex_patterns = [re.compile(pattern) for pattern in unwanted_patterns]
+
+    for line in lines:
+        line = line.strip()
+        if any(regex.match(line) for regex in regex_patterns):
+            continue
+        line = legacy_replace_unicode_symbols(line)
+        filtered_lines.append(line)
+    return filtered_lines
+
+
+def legacy_format_output(output_text):
+    sections = {}
+    current_section = None
+    for line in legacy_filter_unwanted_data(legacy_clean_ansi_sequences(output_text).splitlines()):
+        if "Results for" in line or "Social media" in line:
+            current_section = line.strip().replace("Results for ", "").replace(":", "")
+            sections[current_section] = []
+        elif line.startswith("URL:") and current_section:
+            sections[current_section].append(line.strip())
+        elif line.strip():
+            if current_section:
+                sections[current_section].append(line.strip())
+            else:
+                sections["General"] = sections.get("General", []) + [line.strip()]
+    return sections
+
+
+# Turn recorded sections back into the coloured text report a tool prints
+def rebuild_report(sections, banner=()):
+    lines = list(banner)
+    for name, entries in sections.items():
+        if name != "General":
+            header = name if name == "Social media" else f"Results for {name}"
+            lines.append(f"\x1b[1;34m{header}:\x1b[0m")
+        for index, entry in enumerate(entries):
+            branch = "\u2514\u2500\u2500" if index == len(entries) - 1 else "\u251c\u2500\u2500"
+            lines.append(f"  \x1b[32m{branch}\x1b[0m {entry}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def best_of(func, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Copies of each report")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    with open(RECORDED_RESULT, encoding="utf-8") as f:
+        recorded = json.load(f)["tools_results"]
+
+    print(f"{'tool':<12} {'scale':>6} {'lines':>7} {'legacy ms':>10} {'new ms':>8} {'speedup':>8}")
+    for tool, sections in recorded.items():
+        report = rebuild_report(sections, PHUNTER_BANNER if tool == "phunter" else ())
+        for scale in args.scales:
+            # Scaled copies repeat the General block, which the old code grew by concatenation
+            text = report * scale
+            new_parser = PARSERS[tool]
+            assert new_parser.parse(text) == legacy_format_output(text), tool
+            legacy = best_of(legacy_format_output, text, args.repeat)
+            new = best_of(new_parser.parse, text, args.repeat)
+            print(f"{tool:<12} {scale:>6} {text.count(chr(10)):>7} {legacy * 1000:>10.2f} "
+                  f"{new * 1000:>8.2f} {legacy / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Micro-benchmarks for the parsing and merge stages, checked against a stored baseline.
+
+Runs csv_to_json, process_json_file / clean_malformed_json (email-setup/final_op2.py),
+format_output (the phone SectionParser) and clean_ansi_sequences on the recorded
+tool outputs in the repo and on 10x/100x scaled copies. Reports throughput and
+peak memory and exits with status 1 when a case is slower or uses more memory
+than benchmarks/baseline.json allows.
+
+    python benchmarks/run_benchmarks.py                    # compare with the baseline
+    python benchmarks/run_benchmarks.py --update-baseline  # record this machine's numbers
+
+Throughput depends on the machine, so record the baseline where the suite runs.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, os.path.join(ROOT, "email-setup"))
+sys.path.insert(0, os.path.join(ROOT, "phoneinfo-setup"))
+from final_op2 import csv_to_json, process_json_file  # noqa: E402
+from phone_parsers import PARSERS, clean_ansi_sequences  # noqa: E402
+from bench_phone_parsers import PHUNTER_BANNER, rebuild_report  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+SCALES = (1, 10, 100)
+
+HOLEHE_CSV = os.path.join(ROOT, "Combined_folder", "holehe_1732902370_rhythmtom29@gmail.com_results.csv")
+MAILLEAKS_JSON = os.path.join(ROOT, "Combined_folder", "mailleaks.json")
+USERNAME_RESULT = os.path.join(ROOT, "rudra7404.json")
+PHONE_RESULT = os.path.join(ROOT, "+919773481532.json")
+
+
+# Repeat a CSV's data rows scale times under one header
+def scale_csv(source, destination, scale):
+    with open(source, encoding="utf-8") as f:
+        header, *rows = f.read().splitlines(keepends=True)
+    with open(destination, "w", encoding="utf-8") as f:
+        f.write(header)
+        for _ in range(scale):
+            f.writelines(rows)
+
+
+# Write rows from a merged result back out as the tool's CSV
+def write_csv_rows(rows, destination, scale):
+    with open(destination, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for _ in range(scale):
+            writer.writerows(rows)
+
+
+# A single document at scale 1, scale documents back to back (the malformed path) above it
+def scale_json(document, destination, scale):
+    with open(destination, "w", encoding="utf-8") as f:
+        for _ in range(scale):
+            json.dump(document, f, indent=4)
+            f.write("\n")
+
+
+def build_cases(tmp):
+    """Return (name, function, argument, size in bytes) for every benchmark case."""
+    with open(USERNAME_RESULT, encoding="utf-8") as f:
+        username_result = json.load(f)
+    with open(MAILLEAKS_JSON, encoding="utf-8") as f:
+        mailleaks = json.load(f)
+    with open(PHONE_RESULT, encoding="utf-8") as f:
+        phone_results = json.load(f)["tools_results"]
+
+    cases = []
+    for scale in SCALES:
+        holehe = os.path.join(tmp, f"holehe_x{scale}.csv")
+        scale_csv(HOLEHE_CSV, holehe, scale)
+        sherlock = os.path.join(tmp, f"sherlock_x{scale}.csv")
+        write_csv_rows(username_result["rudra7404.csv"], sherlock, scale)
+        cases.append((f"csv_to_json/holehe/x{scale}", csv_to_json, holehe, os.path.getsize(holehe)))
+        cases.append((f"csv_to_json/sherlock/x{scale}", csv_to_json, sherlock, os.path.getsize(sherlock)))
+
+        for label, document in (("mailleaks", mailleaks), ("username_result", username_result)):
+            path = os.path.join(tmp, f"{label}_x{scale}.json")
+            scale_json(document, path, scale)
+            cases.append((f"process_json_file/{label}/x{scale}", process_json_file, path, os.path.getsize(path)))
+
+        for tool, sections in phone_results.items():
+            report = rebuild_report(sections, PHUNTER_BANNER if tool == "phunter" else ()) * scale
+            size = len(report.encode("utf-8"))
+            cases.append((f"format_output/{tool}/x{scale}", PARSERS[tool].parse, report, size))
+            cases.append((f"clean_ansi_sequences/{tool}/x{scale}", clean_ansi_sequences, report, size))
+    return cases
+
+
+def measure(func, argument, min_time, min_runs=3):
+    """Best wall time over repeated runs, then peak traced memory of one run."""
+    # The merge functions log as they go; keep that out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _measure(func, argument, min_time, min_runs)
+
+
+def _measure(func, argument, min_time, min_runs):
+    best = float("inf")
+    runs = 0
+    started = time.perf_counter()
+    while runs < min_runs or time.perf_counter() - started < min_time:
+        run_started = time.perf_counter()
+        func(argument)
+        best = min(best, time.perf_counter() - run_started)
+        runs += 1
+
+    tracemalloc.start()
+    func(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to spend timing each case")
+    parser.add_argument("--tolerance", type=float, default=0.30,
+                        help="Allowed throughput drop / peak memory growth before failing (0.30 = 30%%)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE) and not args.update_baseline:
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<44} {'KB':>8} {'MB/s':>9} {'base MB/s':>10} {'peak KB':>9} {'base KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func, argument, size in build_cases(tmp):
+            if args.filter not in name:
+                continue
+            elapsed, peak = measure(func, argument, args.min_time)
+            throughput = size / elapsed / (1024 * 1024)
+            results[name] = {"mb_per_s": round(throughput, 3), "peak_kb": round(peak / 1024, 1)}
+
+            expected = baseline.get(name)
+            flag = ""
+            if expected:
+                if throughput < expected["mb_per_s"] * (1 - args.tolerance):
+                    regressions.append(f"{name}: {throughput:.2f} MB/s, baseline {expected['mb_per_s']:.2f} MB/s")
+                    flag = "  SLOWER"
+                if peak / 1024 > expected["peak_kb"] * (1 + args.tolerance):
+                    regressions.append(f"{name}: peak {peak / 1024:.0f} KB, baseline {expected['peak_kb']:.0f} KB")
+                    flag += "  MORE MEMORY"
+            print(f"{name:<44} {size / 1024:>8.1f} {throughput:>9.2f} "
+                  f"{expected['mb_per_s'] if expected else '-':>10} {peak / 1024:>9.1f} "
+                  f"{expected['peak_kb'] if expected else '-':>9}{flag}")
+
+    if args.update_baseline:
+        if args.filter and os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, encoding="utf-8") as f:
+                results = {**json.load(f), **results}
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return
+
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    if not baseline:
+        print("\nNo baseline recorded yet; run with --update-baseline to create one.")
+
+
+if __name__ == "__main__":
+    main()
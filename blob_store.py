@@ -0,0 +1,149 @@
+import os
+import json
+import lzma
+import time
+import zlib
+import hashlib
+import tempfile
+import threading
+
+# File extension of each codec, so blobs stay readable when BLOB_COMPRESSION changes
+CODECS = {
+    "zlib": ".zz",
+    "lzma": ".xz",
+}
+
+
+def compressor(codec):
+    return lzma.LZMACompressor(preset=6) if codec == "lzma" else zlib.compressobj(6)
+
+
+def decompress(codec, data):
+    return lzma.decompress(data) if codec == "lzma" else zlib.decompress(data)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class BlobStore:
+    """Content-addressed, compressed store of raw tool output files.
+
+    Blobs live at <root>/blobs/<2 hex>/<sha256><ext> and are written once, so an
+    output seen in many scans takes its space once. Each job gets a manifest at
+    <root>/jobs/<job_id>.json mapping its file paths to blob digests.
+    """
+
+    def __init__(self, root, codec="zlib"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown compression '{codec}', expected one of {', '.join(CODECS)}")
+        self.root = root
+        self.codec = codec
+        self.lock = threading.Lock()
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_in = 0
+        self.bytes_written = 0
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "jobs"), exist_ok=True)
+
+    def _blob_path(self, digest, codec):
+        return os.path.join(self.root, "blobs", digest[:2], digest + CODECS[codec])
+
+    def find(self, digest):
+        """Return (path, codec) of a stored blob, or None."""
+        for codec in CODECS:
+            path = self._blob_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def put_file(self, path):
+        """Store a file unless its content is already stored. Returns (digest, size)."""
+        digest, size = file_digest(path)
+        if self.find(digest):
+            with self.lock:
+                self.deduplicated += 1
+                self.bytes_in += size
+            return digest, size
+
+        target = self._blob_path(digest, self.codec)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Write to a temporary file first so a reader never sees half a blob
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(target))
+        written = 0
+        try:
+            with os.fdopen(handle, "wb") as blob, open(path, "rb") as file:
+                compress = compressor(self.codec)
+                for chunk in iter(lambda: file.read(65536), b""):
+                    data = compress.compress(chunk)
+                    blob.write(data)
+                    written += len(data)
+                data = compress.flush()
+                blob.write(data)
+                written += len(data)
+            os.replace(temporary, target)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        with self.lock:
+            self.stored += 1
+            self.bytes_in += size
+            self.bytes_written += written
+        return digest, size
+
+    def read(self, digest):
+        """Return the original content of a blob, or None if it is not stored."""
+        found = self.find(digest)
+        if found is None:
+            return None
+        path, codec = found
+        with open(path, "rb") as blob:
+            return decompress(codec, blob.read())
+
+    def archive_job(self, job_id, entity, target, folder, skip=()):
+        """Store every file under folder and write the job's manifest.
+
+        Files named in skip (paths relative to folder) and names starting with "_"
+        (status files) are left out. Returns the manifest.
+        """
+        files = {}
+        for root, _, names in os.walk(folder):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, folder).replace(os.sep, "/")
+                if name.startswith("_") or relative in skip:
+                    continue
+                digest, size = self.put_file(path)
+                files[relative] = {"sha256": digest, "size": size}
+        manifest = {"job_id": job_id, "entity": entity, "target": target, "archived_at": time.time(), "files": files}
+        if files:
+            path = os.path.join(self.root, "jobs", f"{job_id}.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+            os.replace(path + ".tmp", path)
+        return manifest
+
+    def manifest(self, job_id):
+        """Return a job's manifest, or None if nothing was archived for it."""
+        try:
+            with open(os.path.join(self.root, "jobs", f"{job_id}.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "codec": self.codec,
+                "stored": self.stored,
+                "deduplicated": self.deduplicated,
+                "bytes_in": self.bytes_in,
+                "bytes_written": self.bytes_written,
+            }
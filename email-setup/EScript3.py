@@ -2,9 +2,83 @@ import subprocess
 import re
 import os
 import pty
+import select
 import time
 import shutil
+import signal
 import argparse
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Per-tool deadline in seconds, overridable through the environment
+TOOL_TIMEOUTS = {
+    "Breach-Checker": int(os.getenv("BREACH_CHECKER_TIMEOUT", "60")),
+    "Holehe": int(os.getenv("HOLEHE_TIMEOUT", "300")),
+    "BreachCheck": int(os.getenv("BREACHCHECK_TIMEOUT", "120")),
+}
+
+# Absolute deadline of the whole scan (epoch seconds) set by app.py. Tools are
+# cut off early enough to leave MERGE_RESERVE_SECONDS for merging their output.
+SCAN_DEADLINE = float(os.getenv("SCAN_DEADLINE") or 0)
+MERGE_RESERVE_SECONDS = float(os.getenv("MERGE_RESERVE_SECONDS", "10"))
+
+# Breach-Checker is treated as finished once it prints nothing for this long
+BREACH_CHECKER_IDLE_TIMEOUT = float(os.getenv("BREACH_CHECKER_IDLE_TIMEOUT", "5"))
+
+# app.py's rate limiter, shared by every container calling the same upstream APIs
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "").rstrip("/")
+
+# Colour codes and cursor moves, which tools often print after a prompt
+ANSI_ESCAPE = re.compile(r'\x1B[@-_][0-?]*[ -/]*[@-~]')
+
+# Set when the scan is cancelled; every running tool is stopped
+cancel_event = threading.Event()
+
+
+class ToolCancelled(Exception):
+    """Raised when a tool is stopped because the scan was cancelled."""
+
+
+class ToolRateLimited(Exception):
+    """Raised when a tool's upstream API gave no token in time or its daily quota is used up."""
+
+
+# Ask app.py's rate limiter for a token for an upstream API, retrying until
+# timeout. Runs unlimited when no limiter is configured or it cannot be reached.
+def acquire_api_token(api, timeout):
+    if not RATE_LIMIT_URL:
+        return True
+    give_up = time.monotonic() + timeout
+    while True:
+        wait = max(0.0, min(30.0, give_up - time.monotonic()))
+        request = urllib.request.Request(f"{RATE_LIMIT_URL}/{api}/acquire?wait={wait:.1f}", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=wait + 10):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                print(f"Rate limiter answered {e.code} for {api}, running without it")
+                return True
+            body = json.loads(e.read() or b"{}")
+            if body.get("quota_exhausted") or time.monotonic() >= give_up or cancel_event.is_set():
+                return False
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Rate limiter unreachable ({e}), running {api} without it")
+            return True
+
+
+def tool_timeout(timeout):
+    """Return the tool's timeout shortened to the scan deadline, and whether it was shortened."""
+    if not SCAN_DEADLINE:
+        return timeout, False
+    remaining = SCAN_DEADLINE - MERGE_RESERVE_SECONDS - time.time()
+    if remaining < timeout:
+        return max(0.0, remaining), True
+    return timeout, False
 
 
 def is_valid_email(email):
@@ -13,57 +87,130 @@ def is_valid_email(email):
     return re.match(pattern, email)
 
 
-def run_command_with_input(command, input_data=None, stop_after=5):
-    """Run a shell command in a pseudo-terminal, send input, and stop it after some time."""
+def looks_like_prompt(output):
+    """Whether the output ends in an unanswered prompt such as "Save results? (y/n): "."""
+    tail = re.split(r"[\r\n]", ANSI_ESCAPE.sub("", output))[-1].strip()
+    return bool(tail) and tail[-1] in "?:)]>"
+
+
+def stop_process_group(process):
+    """Terminate a process and its children, killing them if they linger."""
     try:
-        master, slave = pty.openpty()  # Create a pseudo-terminal
-        process = subprocess.Popen(
-            command,
-            shell=True,
-            stdin=slave,
-            stdout=master,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        if input_data:
-            os.write(master, input_data.encode())  # Send input
-
-        time.sleep(stop_after)  # Wait before terminating
-        process.terminate()
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=2)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
         process.wait()
 
-        # Read output from the pseudo-terminal
-        os.close(slave)
-        output = os.read(master, 4096).decode("utf-8")
-        os.close(master)
-
-        if process.returncode != 0:
-            print(f"Error running command: {command}\nError Details:\n{process.stderr.read()}")
-        return output
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        exit(1)
 
+def run_command_with_input(command, input_data=None, timeout=60, idle_timeout=5, cancel=None):
+    """Run a shell command in a pseudo-terminal, answering its prompts as they appear.
+
+    Each line of input_data answers one prompt. Output is read until the
+    process exits or stays silent for idle_timeout seconds with no answers
+    left to send; the timeout is a hard deadline. A non-zero exit raises
+    CalledProcessError, unless the process was stopped for going idle.
+    """
+    answers = input_data.splitlines(keepends=True) if input_data else []
+    master, slave = pty.openpty()  # Create a pseudo-terminal
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdin=slave,
+        stdout=slave,
+        stderr=slave,
+        start_new_session=True  # Own process group so the whole tool can be stopped
+    )
+    os.close(slave)  # The child holds its own copy
 
-def run_command_without_terminal(command):
-    """Run a command without using a pseudo-terminal and capture its output."""
+    chunks = []
+    output = ""
+    started = last_output = time.monotonic()
+    answered_at = None  # Output length when the last prompt was answered
+    stopped_idle = False
     try:
-        process = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            print(f"Error running command: {command}\nError Details:\n{stderr}")
-        return stdout
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        exit(1)
+        while True:
+            now = time.monotonic()
+            if cancel is not None and cancel.is_set():
+                stop_process_group(process)
+                raise ToolCancelled(command)
+            if now - started > timeout:
+                stop_process_group(process)
+                raise subprocess.TimeoutExpired(command, timeout, output=output)
+
+            readable, _, _ = select.select([master], [], [], 0.1)
+            if readable:
+                try:
+                    data = os.read(master, 4096)
+                except OSError:  # EIO: the child closed the terminal
+                    data = b""
+                if not data:
+                    break
+                chunks.append(data)
+                output = b"".join(chunks).decode("utf-8", errors="replace")
+                last_output = time.monotonic()
+                continue
+
+            if process.poll() is not None:
+                break
+            quiet_for = now - last_output
+            # Answer a prompt once the tool has stopped printing and is waiting on us
+            if answers and quiet_for >= 0.2 and answered_at != len(output) and looks_like_prompt(output):
+                os.write(master, answers.pop(0).encode())
+                answered_at = len(output)
+            elif quiet_for > idle_timeout and answers:
+                # Silent with answers left: likely a prompt we did not recognise, so answer it
+                os.write(master, answers.pop(0).encode())
+                answered_at = len(output)
+                last_output = now
+            elif quiet_for > idle_timeout:
+                print(f"No output for {idle_timeout}s, stopping: {command}")
+                stop_process_group(process)
+                stopped_idle = True
+                break
+    finally:
+        os.close(master)
+
+    if process.wait() != 0 and not stopped_idle:
+        print(f"Error running command: {command}\nExit code: {process.returncode}")
+        raise subprocess.CalledProcessError(process.returncode, command, output=output)
+    return output
+
+
+def run_command_without_terminal(command, timeout=None, cancel=None):
+    """Run a command without using a pseudo-terminal and capture its output.
+
+    The command is killed (with its whole process group) when the timeout
+    passes or the cancel event is set. A non-zero exit raises CalledProcessError.
+    """
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True  # Own process group so the whole tool can be killed
+    )
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            cancelled = cancel is not None and cancel.is_set()
+            if cancelled or (deadline and time.monotonic() > deadline):
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                if cancelled:
+                    raise ToolCancelled(command)
+                raise subprocess.TimeoutExpired(command, timeout)
+
+    if process.returncode != 0:
+        print(f"Error running command: {command}\nError Details:\n{stderr}")
+        raise subprocess.CalledProcessError(process.returncode, command, output=stdout, stderr=stderr)
+    return stdout
 
 
 def check_and_prepare_tool(tool_dir, tool_name):
@@ -72,8 +219,8 @@ def check_and_prepare_tool(tool_dir, tool_name):
         print(f"Error: Directory '{tool_dir}' for {tool_name} does not exist.")
         exit(1)
 
-    venv_path = os.path.join(tool_dir, "env", "bin", "activate")
-    if not os.path.isfile(venv_path):
+    venv_python = os.path.join(tool_dir, "env", "bin", "python")
+    if not os.path.isfile(venv_python):
         print(f"Error: Virtual environment for '{tool_name}' not found in '{tool_dir}'. Please set it up first.")
         exit(1)
 
@@ -89,6 +236,94 @@ def move_file_to_combined_folder(source_file, combined_folder):
         print(f"Warning: File {source_file} does not exist and could not be moved.")
 
 
+def run_breach_checker(email, combined_folder, timeout):
+    tool1_dir = "/app/Breach-Checker"
+    # Run through the venv's interpreter directly; no bash or activate needed
+    command = f"cd {tool1_dir} && env/bin/python -m bchecker -m 1 -e \"{email}\""
+    output = run_command_with_input(
+        command, input_data="y\ny\n", timeout=timeout,
+        idle_timeout=BREACH_CHECKER_IDLE_TIMEOUT, cancel=cancel_event
+    )
+    print(f"Breach-Checker Output:\n{output}")
+
+    # Move the output file to Combined_folder
+    breach_checker_output = os.path.join(tool1_dir, "mailleaks.json")
+    move_file_to_combined_folder(breach_checker_output, combined_folder)
+
+
+def run_holehe(email, combined_folder, timeout):
+    tool2_dir = "/app/holehe"
+    command = f'cd "{tool2_dir}" && env/bin/holehe {email} --only-used -C'
+    output = run_command_without_terminal(command, timeout=timeout, cancel=cancel_event)
+    print(f"Holehe Output:\n{output}")
+
+    # Dynamically find the latest output file matching the naming pattern
+    holehe_output_file = None
+    for file in os.listdir(tool2_dir):
+        if file.startswith("holehe_") and file.endswith("_results.csv"):
+            file_path = os.path.join(tool2_dir, file)
+            if holehe_output_file is None or os.path.getmtime(file_path) > os.path.getmtime(holehe_output_file):
+                holehe_output_file = file_path
+
+    # Move the output file to Combined_folder
+    if holehe_output_file:
+        move_file_to_combined_folder(holehe_output_file, combined_folder)
+    else:
+        print("Warning: Holehe output file not found.")
+
+
+def run_breachcheck(email, combined_folder, timeout):
+    tool3_dir = "/app/BreachCheck"
+    if not acquire_api_token("breacheddirectory", timeout):
+        raise ToolRateLimited("No BreachedDirectory API token available")
+    command = f"cd {tool3_dir} && env/bin/python BreachCheck.py -t {email} -oR {email}.json"
+    output = run_command_without_terminal(command, timeout=timeout, cancel=cancel_event)
+    print(f"BreachCheck Output:\n{output}")
+
+    # Move the output file to Combined_folder
+    breach_check_output = os.path.join(tool3_dir, f"{email}.json")
+    move_file_to_combined_folder(breach_check_output, combined_folder)
+
+
+# Tool name -> (install directory, runner)
+TOOLS = {
+    "Breach-Checker": ("/app/Breach-Checker", run_breach_checker),
+    "Holehe": ("/app/holehe", run_holehe),
+    "BreachCheck": ("/app/BreachCheck", run_breachcheck),
+}
+
+
+def run_tool(tool_name, email, combined_folder):
+    """Run one tool under its deadline and report how it went."""
+    runner = TOOLS[tool_name][1]
+    timeout, shortened = tool_timeout(TOOL_TIMEOUTS[tool_name])
+    started = time.monotonic()
+    status = {"tool": tool_name, "status": "ok", "error": None}
+    if timeout <= 0:
+        status.update(status="deadline", error="Scan deadline passed before the tool started", duration=0.0)
+        print(f"Skipping {tool_name}: the scan deadline has passed")
+        return status
+    print(f"Running {tool_name}...")
+    try:
+        runner(email, combined_folder, timeout)
+    except subprocess.TimeoutExpired:
+        # "deadline" means the scan ran out of time, not that the tool hung
+        status["status"] = "deadline" if shortened else "timeout"
+        status["error"] = f"Stopped after {round(timeout, 1)}s"
+    except ToolCancelled:
+        status["status"] = "cancelled"
+    except ToolRateLimited as e:
+        status["status"] = "rate_limited"
+        status["error"] = str(e)
+    except Exception as e:
+        status["status"] = "failed"
+        status["error"] = str(e)
+        print(f"Failed to run {tool_name}: {e}")
+    status["duration"] = round(time.monotonic() - started, 3)
+    print(f"{tool_name} finished with status '{status['status']}' in {status['duration']}s")
+    return status
+
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Run email-based security tools.")
@@ -97,6 +332,11 @@ def main():
         default=os.getenv("EMAIL"),
         help="Email address to use with the tools. Can also be set via EMAIL environment variable."
     )
+    parser.add_argument(
+        "--output-dir", type=str, required=False,
+        default=os.getenv("OUTPUT_DIR", "/app/Combined_folder"),
+        help="Folder to collect tool outputs in. Can also be set via OUTPUT_DIR environment variable."
+    )
     args = parser.parse_args()
 
     email = args.email
@@ -105,74 +345,28 @@ def main():
         print("Error: A valid email address is required. Provide it via --email or EMAIL environment variable.")
         exit(1)
 
-    combined_folder = "/app/Combined_folder"  # Common folder to store output files
-
-    # Tool 1: Breach-Checker
-    tool1_dir = "/app/Breach-Checker"
-    check_and_prepare_tool(tool1_dir, "Breach-Checker")  # Pass both arguments
-    print("Running Breach-Checker...")
-    try:
-        command = (
-            f"bash -c 'cd {tool1_dir} && source env/bin/activate && "
-            f"python -m bchecker -m 1 -e \"{email}\" && deactivate'"
-        )
-        output = run_command_with_input(command, input_data="y\ny\n", stop_after=5)
-        print(f"Breach-Checker Output:\n{output}")
-
-        # Move the output file to Combined_folder
-        breach_checker_output = os.path.join(tool1_dir, "mailleaks.json")
-        move_file_to_combined_folder(breach_checker_output, combined_folder)
+    combined_folder = args.output_dir  # Per-job folder to store output files
 
-    except Exception as e:
-        print(f"Failed to run Breach-Checker: {e}")
-
-    # Tool 2: Holehe
-    tool2_dir = "/app/holehe"
-    check_and_prepare_tool(tool2_dir, "Holehe")  # Pass both arguments
-    print("Running Holehe...")
-    try:
-        command = (
-            f'bash -c "cd \\"{tool2_dir}\\" && source env/bin/activate && '
-            f'holehe {email} --only-used -C && deactivate"'
-            )
-        output = run_command_without_terminal(command)
-        print(f"Holehe Output:\n{output}")
-
-        # Dynamically find the latest output file matching the naming pattern
-        holehe_output_file = None
-        for file in os.listdir(tool2_dir):
-            if file.startswith("holehe_") and file.endswith("_results.csv"):
-                file_path = os.path.join(tool2_dir, file)
-                if holehe_output_file is None or os.path.getmtime(file_path) > os.path.getmtime(holehe_output_file):
-                    holehe_output_file = file_path
-
-        # Move the output file to Combined_folder
-        if holehe_output_file:
-            move_file_to_combined_folder(holehe_output_file, combined_folder)
-        else:
-            print("Warning: Holehe output file not found.")
+    # SCAN_TOOLS (comma separated) limits a rescan to the tools whose results are stale
+    requested = [name for name in os.getenv("SCAN_TOOLS", "").split(",") if name]
+    selected = [name for name in TOOLS if not requested or name in requested]
 
-    except Exception as e:
-        print(f"Failed to run Holehe: {e}")
+    # Stop every running tool when the container is asked to stop; finalScript.py
+    # passes on the SIGTERM app.py sends to the container
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancel_event.set())
 
-    # Tool 3: BreachCheck
-    tool3_dir = "/app/BreachCheck"
-    check_and_prepare_tool(tool3_dir, "BreachCheck")  # Pass both arguments
-    print("Running BreachCheck...")
-    try:
-        command = (
-            f"bash -c 'cd {tool3_dir} && source env/bin/activate && "
-            f"python BreachCheck.py -t {email} -oR {email}.json && deactivate'"
-        )
-        output = run_command_without_terminal(command)
-        print(f"BreachCheck Output:\n{output}")
+    for tool_name in selected:
+        check_and_prepare_tool(TOOLS[tool_name][0], tool_name)
 
-        # Move the output file to Combined_folder
-        breach_check_output = os.path.join(tool3_dir, f"{email}.json")
-        move_file_to_combined_folder(breach_check_output, combined_folder)
+    # The tools are independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=max(1, len(selected))) as executor:
+        futures = [executor.submit(run_tool, name, email, combined_folder) for name in selected]
+        statuses = [future.result() for future in futures]
 
-    except Exception as e:
-        print(f"Failed to run BreachCheck: {e}")
+    # Leave the per-tool status next to the outputs; final_op2.py skips "_" files
+    os.makedirs(combined_folder, exist_ok=True)
+    with open(os.path.join(combined_folder, "_tool_status.json"), "w", encoding="utf-8") as status_file:
+        json.dump(statuses, status_file, indent=4)
 
 
 if __name__ == "__main__":
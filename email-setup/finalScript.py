@@ -1,21 +1,61 @@
+import os
+import sys
+import json
+import time
+import signal
 import subprocess
 
 # Define the paths to both scripts
 script3_path = "./EScript3.py"
 final_op2_path = "./final_op2.py"
 
+# Per-job folder set by app.py; the stage timings are left there for it to read
+output_dir = os.getenv("OUTPUT_DIR", "/app/Combined_folder")
+
+# Script running now, and whether the container was asked to stop
+current = None
+terminated = False
+
+# This script is the container's PID 1, so SIGTERM from app.py lands here.
+# Pass it on: EScript3.py then stops its tools and records their status.
+def forward_sigterm(signum, frame):
+    global terminated
+    terminated = True
+    if current is not None and current.poll() is None:
+        current.send_signal(signal.SIGTERM)
+
+signal.signal(signal.SIGTERM, forward_sigterm)
+
 def run_script(script_path):
-    try:
-        print(f"Running script: {script_path}")
-        subprocess.run(["python3", script_path], check=True)
+    global current
+    started = time.monotonic()
+    print(f"Running script: {script_path}")
+    current = subprocess.Popen(["python3", script_path])
+    if terminated:
+        current.send_signal(signal.SIGTERM)  # Asked to stop while it was starting
+    returncode = current.wait()
+    if returncode == 0:
         print(f"Script {script_path} completed successfully.\n")
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while running {script_path}: {e}")
+    else:
+        print(f"Error occurred while running {script_path}: exit code {returncode}")
+    return round(time.monotonic() - started, 3)
+
+stages = {}
 
 # Run Script3.py
-run_script(script3_path)
+stages["tools"] = run_script(script3_path)
+
+# A stopped scan is not merged; app.py collects the tools' partial output
+if terminated:
+    print("Stopped by SIGTERM, skipping the merge")
+    sys.exit(128 + signal.SIGTERM)
 
 # Run final_op2.py
-run_script(final_op2_path)
+stages["merge"] = run_script(final_op2_path)
+
+# Hand the stage timings back to app.py; final_op2.py skips "_" files
+os.makedirs(output_dir, exist_ok=True)
+with open(os.path.join(output_dir, "_timings.json"), "w", encoding="utf-8") as timings_file:
+    json.dump({"stages": stages}, timings_file, indent=4)
 
 print("All scripts have completed execution.")
@@ -1,13 +1,21 @@
 import os
+import re
 import csv
+import gzip
 import json
 
 # Define folder and output path
-input_folder = "/app/Combined_folder"  # Ensure absolute path for Docker consistency
+input_folder = os.getenv("OUTPUT_DIR", "/app/Combined_folder")  # Per-job folder set by app.py
 output_file = os.path.join(input_folder, "final_output.json")  # Save directly to Combined_folder
 
-# Initialize a dictionary to hold the combined data
-combined_data = {}
+# "stream" writes compact JSON file by file; "memory" builds one dict and pretty-prints it
+merge_mode = os.getenv("MERGE_MODE", "stream")
+
+# Gzip the streamed output as final_output.json.gz
+merge_gzip = os.getenv("MERGE_GZIP") == "1"
+
+# Separators for compact JSON output
+COMPACT = (",", ":")
 
 # Function to convert CSV to JSON
 def csv_to_json(csv_file_path):
@@ -18,22 +26,70 @@ def csv_to_json(csv_file_path):
             data.append(row)
     return data
 
+# Whitespace allowed between concatenated JSON documents
+WHITESPACE = re.compile(r'\s*')
+
+# Characters that can still follow a decoded number, e.g. the "." of "7.25"
+NUMBER_TAIL = re.compile(r'[\d.eE+-]*')
+
+# Function to yield each document from concatenated or newline-delimited JSON.
+# Reads in chunks and decodes each document once, so the work is linear in the
+# file size and memory is bounded by the largest document.
+def iter_json_documents(json_file, chunk_size=65536, max_document_size=64 * 1024 * 1024):
+    decoder = json.JSONDecoder()
+    buffer = json_file.read(chunk_size)
+    pos = 0
+    eof = not buffer
+    read_size = chunk_size
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer, pos = json_file.read(chunk_size), 0
+            eof = not buffer
+            continue
+        try:
+            start = pos
+            document, pos = decoder.raw_decode(buffer, pos)
+            at_end = NUMBER_TAIL.match(buffer, pos).end() == len(buffer)
+            if at_end and not eof and isinstance(document, (int, float)):
+                # A number reaching the end of the buffer may go on in the next read
+                chunk = json_file.read(chunk_size)
+                if chunk:
+                    buffer, pos = buffer[start:] + chunk, 0
+                    continue
+                eof = True
+        except json.JSONDecodeError as e:
+            pending = len(buffer) - pos
+            # Truncated only if nothing but the rest of one line follows the error;
+            # a bad line followed by others is malformed and dropped right away
+            if not eof and pending < max_document_size and buffer.find("\n", e.pos) == -1:
+                # The document is split across reads: fetch more, doubling
+                # the read size so retries stay linear overall
+                chunk = json_file.read(max(read_size, pending))
+                read_size = max(read_size, pending) * 2
+                buffer, pos = buffer[pos:] + chunk, 0
+                eof = not chunk
+                continue
+            # Malformed data: drop the rest of this line and resume on the next one
+            newline = buffer.find("\n", pos)
+            if newline != -1:
+                pos = newline + 1
+            elif eof:
+                return
+            else:
+                buffer, pos = json_file.read(chunk_size), 0
+                eof = not buffer
+            read_size = chunk_size
+            continue
+        read_size = chunk_size
+        yield document
+
 # Function to clean malformed JSON
 def clean_malformed_json(file_path):
-    corrected_data = []
     with open(file_path, mode='r', encoding='utf-8') as json_file:
-        buffer = ""
-        for line in json_file:
-            buffer += line.strip()  # Combine lines into a buffer
-            try:
-                # Try parsing the current buffer
-                parsed = json.loads(buffer)
-                corrected_data.append(parsed)
-                buffer = ""  # Clear the buffer after successful parse
-            except json.JSONDecodeError:
-                # If parsing fails, continue adding to the buffer
-                pass
-    return corrected_data
+        return list(iter_json_documents(json_file))
 
 # Function to process JSON files
 def process_json_file(file_path):
@@ -46,33 +102,120 @@ def process_json_file(file_path):
         print(f"Attempting to clean malformed JSON in {file_path}")
         return clean_malformed_json(file_path)
 
-# Process all files in the input folder
-for filename in os.listdir(input_folder):
-    file_path = os.path.join(input_folder, filename)
-    
-    if filename.endswith(".csv"):
-        try:
-            csv_data = csv_to_json(file_path)
-            combined_data[filename] = csv_data
-        except Exception as e:
-            print(f"Error processing CSV file {filename}: {e}")
-    
-    elif filename.endswith(".json"):
+# Function to list the tool output files to merge
+def files_to_merge():
+    for filename in sorted(os.listdir(input_folder)):
+        # Skip the output of a previous merge and internal files such as _tool_status.json
+        if filename.startswith("final_output.json") or filename.startswith("_"):
+            continue
+        if filename.endswith(".csv") or filename.endswith(".json"):
+            yield filename, os.path.join(input_folder, filename)
+
+# Function to write a CSV file as a JSON array, one row at a time
+def write_csv_rows(csv_file_path, output):
+    output.write("[")
+    try:
+        with open(csv_file_path, mode='r', encoding='utf-8') as csv_file:
+            for index, row in enumerate(csv.DictReader(csv_file)):
+                if index:
+                    output.write(",")
+                output.write(json.dumps(row, separators=COMPACT))
+    finally:
+        # Keep the output valid even if the CSV breaks part way through
+        output.write("]")
+
+# Function to write a JSON file's value one document at a time.
+# A single document is written as is, several are written as a list.
+# write_key() writes the file's key, and is not called when there is nothing to keep.
+def write_json_value(file_path, output, write_key):
+    missing = object()
+    with open(file_path, mode='r', encoding='utf-8') as json_file:
+        documents = iter_json_documents(json_file)
+        first = next(documents, missing)
+        second = next(documents, missing)
+        if first is missing or (second is missing and not first):
+            return False  # Nothing worth keeping, as with the in-memory merge
+        write_key()
+        if second is missing:
+            output.write(json.dumps(first, separators=COMPACT))
+            return True
+        output.write("[" + json.dumps(first, separators=COMPACT))
         try:
-            json_data = process_json_file(file_path)
-            if json_data:
-                combined_data[filename] = json_data
-        except Exception as e:
-            print(f"Error processing JSON file {filename}: {e}")
-
-# Ensure the Combined_folder exists before saving
-if not os.path.exists(input_folder):
-    os.makedirs(input_folder)
-
-# Save the combined data to the output JSON file
-try:
+            output.write("," + json.dumps(second, separators=COMPACT))
+            for document in documents:
+                output.write("," + json.dumps(document, separators=COMPACT))
+        finally:
+            # Keep the output valid even if the file breaks part way through
+            output.write("]")
+    return True
+
+# Function to merge file by file into compact JSON, holding one document at a time
+def merge_streaming():
+    path = output_file + ".gz" if merge_gzip else output_file
+    temp_path = path + ".tmp"
+    opener = gzip.open if merge_gzip else open
+    with opener(temp_path, mode='wt', encoding='utf-8') as output:
+        output.write("{")
+        keys_written = 0
+
+        # Counted as soon as it is written: a file failing after its key still has a (partial) value
+        def write_key(key):
+            nonlocal keys_written
+            output.write(("," if keys_written else "") + json.dumps(key) + ":")
+            keys_written += 1
+
+        for filename, file_path in files_to_merge():
+            try:
+                if filename.endswith(".csv"):
+                    write_key(filename)
+                    write_csv_rows(file_path, output)
+                else:
+                    write_json_value(file_path, output, lambda: write_key(filename))
+            except Exception as e:
+                print(f"Error processing file {filename}: {e}")
+        output.write("}")
+    # Publish the finished file in one step so readers never see half of it
+    os.replace(temp_path, path)
+    return path
+
+# Function to merge everything into one dict and pretty-print it
+def merge_in_memory():
+    # Initialize a dictionary to hold the combined data
+    combined_data = {}
+
+    for filename, file_path in files_to_merge():
+        if filename.endswith(".csv"):
+            try:
+                csv_data = csv_to_json(file_path)
+                combined_data[filename] = csv_data
+            except Exception as e:
+                print(f"Error processing CSV file {filename}: {e}")
+
+        elif filename.endswith(".json"):
+            try:
+                json_data = process_json_file(file_path)
+                if json_data:
+                    combined_data[filename] = json_data
+            except Exception as e:
+                print(f"Error processing JSON file {filename}: {e}")
+
     with open(output_file, mode='w', encoding='utf-8') as output_json_file:
         json.dump(combined_data, output_json_file, indent=4)
-    print(f"Combined data with filenames has been written to {output_file}")
-except Exception as e:
-    print(f"Error writing to output file: {e}")
+    return output_file
+
+# Process all files in the input folder and write the merged output
+def main():
+    # Ensure the Combined_folder exists before saving
+    if not os.path.exists(input_folder):
+        os.makedirs(input_folder)
+
+    # Save the combined data to the output JSON file
+    try:
+        path = merge_in_memory() if merge_mode == "memory" else merge_streaming()
+        print(f"Combined data with filenames has been written to {path}")
+    except Exception as e:
+        print(f"Error writing to output file: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# Production settings for gunicorn: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+# One process: the job queue, rate limiter and in-flight scans live in its memory.
+# Concurrency comes from its threads, kept in step with WEB_THREADS in app.py.
+workers = 1
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "32"))
+
+# Keep few connections waiting for a thread; app.py answers 503 before threads run out
+backlog = threads * 2
+
+# gthread workers only time out when the whole process stops responding, not per request
+timeout = 120
+graceful_timeout = int(os.getenv("DEADLINE_GRACE_SECONDS", "15")) + 15
+keepalive = 5
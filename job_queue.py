@@ -0,0 +1,207 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+
+class QueueFull(Exception):
+    """Raised when a bounded submission finds the entity's wait queue full."""
+
+    def __init__(self, entity, retry_after):
+        super().__init__(f"Too many {entity} scans waiting, retry in {retry_after}s")
+        self.entity = entity
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Run scans on bounded worker pools, one pool per entity type."""
+
+    def __init__(self, runner, concurrency, retention=3600, canceller=None, max_queued=0, max_running=0):
+        self.runner = runner
+        self.concurrency = concurrency
+        # Queued jobs per entity beyond which bounded submissions are refused (0 = no bound)
+        self.max_queued = max_queued
+        # Scans running at once across all entities (0 = only the per-entity pools limit them)
+        self.running_slots = threading.BoundedSemaphore(max_running) if max_running else None
+        # Moving average of scan durations per entity, to tell refused callers when to retry
+        self.average_duration = {}
+        # Called with a running job when it is cancelled, to stop its work
+        self.canceller = canceller
+        self.retention = retention
+        self.jobs = {}
+        self.futures = {}
+        # Coalescing key -> id of the unfinished job that callers with that key share
+        self.in_flight = {}
+        # Submissions that joined an in-flight job instead of starting one, per entity
+        self.coalesced = {entity: 0 for entity in concurrency}
+        self.lock = threading.Lock()
+        # Separate pools so slow username scans cannot starve phone lookups
+        self.executors = {
+            entity: ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"{entity}-scan")
+            for entity, workers in concurrency.items()
+        }
+
+    def submit(self, entity, input_value, coalesce_key=None, bounded=False, **options):
+        """Queue a scan and return its job id immediately.
+
+        Submissions with the coalesce_key of an unfinished job get that job's id
+        instead of a new job, so identical concurrent scans run only once.
+        Bounded submissions raise QueueFull when max_queued jobs already wait.
+        """
+        if entity not in self.executors:
+            raise ValueError(f"No worker pool for entity '{entity}'")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "entity": entity,
+            "input": input_value,
+            "options": options,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "timings": None,
+            "cancel_requested": False,
+            "coalesce_key": coalesce_key,
+            "waiters": 1,
+        }
+        with self.lock:
+            shared_id = self.in_flight.get(coalesce_key) if coalesce_key is not None else None
+            if shared_id is not None:
+                self.jobs[shared_id]["waiters"] += 1
+                self.coalesced[entity] += 1
+                return shared_id
+            if bounded and self.max_queued:
+                queued = sum(1 for other in self.jobs.values() if other["entity"] == entity and other["status"] == "queued")
+                if queued >= self.max_queued:
+                    raise QueueFull(entity, self.retry_after(entity))
+            self._prune()
+            self.jobs[job_id] = job
+            if coalesce_key is not None:
+                self.in_flight[coalesce_key] = job_id
+            self.futures[job_id] = self.executors[entity].submit(self._run, job)
+        return job_id
+
+    def _run(self, job):
+        if self.running_slots:
+            # The job stays queued until a global scan slot is free
+            self.running_slots.acquire()
+        try:
+            return self._run_job(job)
+        finally:
+            if self.running_slots:
+                self.running_slots.release()
+
+    def _run_job(self, job):
+        if job["cancel_requested"]:
+            # Cancelled while it waited for a scan slot
+            with self.lock:
+                job.update(status="cancelled", error="Cancelled before it started", finished_at=time.time())
+                self._leave_in_flight(job)
+            raise CancelledError()
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            job["result"] = self.runner(job)
+            # A cancelled job may still return what it collected before it was stopped
+            job["status"] = "cancelled" if job["cancel_requested"] else "done"
+            return job["result"]
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "cancelled" if job["cancel_requested"] else "failed"
+            raise
+        finally:
+            job["finished_at"] = time.time()
+            with self.lock:
+                self._leave_in_flight(job)
+                duration = job["finished_at"] - job["started_at"]
+                previous = self.average_duration.get(job["entity"])
+                self.average_duration[job["entity"]] = duration if previous is None else 0.8 * previous + 0.2 * duration
+
+    def _leave_in_flight(self, job):
+        # Later submissions with the same key start a new job
+        if self.in_flight.get(job["coalesce_key"]) == job["id"]:
+            del self.in_flight[job["coalesce_key"]]
+
+    def _prune(self):
+        # Forget finished jobs once they are older than the retention window
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+            del self.futures[job_id]
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if it is unknown."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes and return its result (re-raising its error)."""
+        with self.lock:
+            future = self.futures[job_id]
+        return future.result(timeout=timeout)
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one. Returns False if it already finished."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            future = self.futures.get(job_id)
+            if job is None or job["finished_at"] is not None:
+                return False
+            job["cancel_requested"] = True
+            self._leave_in_flight(job)
+            previous = job["status"]
+            if previous == "queued":
+                job["status"] = "cancelled"
+                job["error"] = "Cancelled before it started"
+                job["finished_at"] = time.time()
+        # Done callbacks run inside future.cancel(), so call it without the lock
+        if future.cancel():
+            return True
+        # It started running in the meantime, so stop the runner instead
+        with self.lock:
+            if job["status"] == "cancelled":
+                job.update(status=previous, error=None, finished_at=None)
+        if self.canceller:
+            self.canceller(job)
+        return True
+
+    def release(self, job_id):
+        """Drop one caller's interest in a job, cancelling it once no caller is left."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job["waiters"] -= 1
+            if job["waiters"] > 0:
+                return False
+        return self.cancel(job_id)
+
+    def add_done_callback(self, job_id, callback):
+        """Call callback(job snapshot) once the job has finished."""
+        with self.lock:
+            future = self.futures[job_id]
+        future.add_done_callback(lambda _: callback(self.get(job_id)))
+
+    def retry_after(self, entity):
+        """Seconds until a queue slot is likely to free up: one scan finishing on any worker."""
+        average = self.average_duration.get(entity, 30.0)
+        workers = max(1, self.concurrency.get(entity, 1))
+        return max(1, min(600, int(average / workers + 0.999)))
+
+    def queue_depth(self):
+        """Number of queued (not yet running) jobs per entity type."""
+        depth = {entity: 0 for entity in self.executors}
+        with self.lock:
+            for job in self.jobs.values():
+                if job["status"] == "queued":
+                    depth[job["entity"]] += 1
+        return depth
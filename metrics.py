@@ -0,0 +1,130 @@
+import math
+import threading
+
+# Histogram buckets in seconds, from a cached phone lookup up to a slow username scan
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(name, labels, value):
+    if labels:
+        label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels)
+        name = f"{name}{{{label_text}}}"
+    return f"{name} {format_value(value)}"
+
+
+# Sample values in full; ":g" would round them to 6 significant digits
+def format_value(value):
+    if not isinstance(value, float):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return "NaN" if math.isnan(value) else repr(value)
+
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            series = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self.lock:
+            values = {key: list(series) for key, series in self.values.items()}
+        for key, series in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", labels + [("le", f"{bound:g}")], count
+            yield f"{self.name}_bucket", labels + [("le", "+Inf")], series[-1]
+            yield f"{self.name}_sum", labels, float(series[-2])
+            yield f"{self.name}_count", labels, series[-1]
+
+
+class CallbackMetric:
+    """Gauge or counter read from elsewhere (queue depth, cache counters) at scrape time.
+
+    callback() returns {label values tuple: value}.
+    """
+
+    def __init__(self, name, type, documentation, callback, labelnames=()):
+        self.name = name
+        self.type = type
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        for key, value in sorted(self.callback().items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, type, documentation, callback, labelnames=()):
+        return self.register(CallbackMetric(name, type, documentation, callback, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(format_sample(name, labels, value) for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,114 @@
+import os
+import re
+import csv
+import json
+import threading
+
+ANSI_ESCAPE = re.compile(r'\x1B[@-_][0-?]*[ -/]*[@-~]')
+
+
+# Decode a file holding one JSON document, or several written back to back
+def load_json_documents(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    documents = []
+    index = 0
+    while True:
+        # Skip whitespace between documents
+        while index < len(text) and text[index].isspace():
+            index += 1
+        if index == len(text):
+            return documents
+        document, index = decoder.raw_decode(text, index)
+        documents.append(document)
+
+
+# Parse a raw tool output file into JSON-friendly data (None for unknown types)
+def parse_output_file(path):
+    if path.endswith(".csv"):
+        with open(path, mode='r', encoding='utf-8', newline='') as csv_file:
+            return list(csv.DictReader(csv_file))
+    if path.endswith(".json"):
+        with open(path, mode='r', encoding='utf-8') as json_file:
+            return load_json_documents(json_file.read())
+    if path.endswith(".txt"):
+        with open(path, mode='r', encoding='utf-8', errors='replace') as text_file:
+            text = ANSI_ESCAPE.sub('', text_file.read())
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    return None
+
+
+class WorkspaceWatcher:
+    """Report tool output files in a job workspace as they appear or change."""
+
+    def __init__(self, workspace, skip=()):
+        self.workspace = workspace
+        self.skip = set(skip)
+        self.reported = {}  # path -> (size, mtime) last reported
+        self.pending = {}  # path -> (size, mtime) seen on the previous poll
+        self.settled = []  # Results of settle() that poll() has not returned yet
+        self.lock = threading.Lock()
+
+    def poll(self):
+        """Return (relative name, parsed data) for every settled new or changed file."""
+        with self.lock:
+            results, self.settled = self.settled + self._scan(), []
+            return results
+
+    def settle(self):
+        """Parse every new or changed file without waiting for it to stop changing.
+
+        For when the tools have exited and the workspace is about to be removed;
+        the next poll() returns the results.
+        """
+        with self.lock:
+            self.settled += self._scan(settle=True)
+
+    def _scan(self, settle=False):
+        results = []
+        for root, _, files in os.walk(self.workspace):
+            for name in sorted(files):
+                # "_" files are internal and skipped names are the final merged output
+                if name.startswith("_") or name in self.skip:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self.reported.get(path) == signature:
+                    continue
+                # Only parse a file once it has stopped changing between two polls
+                if not settle and self.pending.get(path) != signature:
+                    self.pending[path] = signature
+                    continue
+                try:
+                    data = parse_output_file(path)
+                except (ValueError, csv.Error, OSError):
+                    continue  # Still being copied in, try again on the next poll
+                self.reported[path] = signature
+                if data is not None:
+                    results.append((os.path.relpath(path, self.workspace), data))
+        return results
+
+
+# Parse whatever tool output a stopped scan left in its workspace, as {file: data}
+def collect_partial_results(workspace, skip=()):
+    results = {}
+    for root, _, files in os.walk(workspace):
+        for name in sorted(files):
+            if name.startswith("_") or name in skip:
+                continue
+            path = os.path.join(root, name)
+            try:
+                data = parse_output_file(path)
+            except (ValueError, csv.Error, OSError) as e:
+                print(f"Skipping unreadable partial output {path}: {e}")
+                continue
+            if data is not None:
+                results[os.path.relpath(path, workspace)] = data
+    return results
@@ -0,0 +1,117 @@
+import re
+import json
+
+# Remove ANSI escape sequences (colours, cursor moves) from tool output
+ANSI_ESCAPE = re.compile(r'\x1B[@-_][0-?]*[ -/]*[@-~]')
+
+# Lines that are banner art or branding rather than results
+DEFAULT_UNWANTED_PATTERNS = [
+    r'^\s*[_]+',                       # ASCII art lines
+    r'^\s*[\(\)]',                     # Lines with parentheses only
+    r'^`-.-\' \\\)\\-\`\\( , o o\\)',  # ASCII face patterns
+    r'^`-    \\\`_`\"\'-',             # ASCII arm/branch
+    r'^`-\(-\'$',                      # ASCII bottom line
+    r'by Norze',                       # Branding info
+    r'^\|\s*Phone number OSINT Tool\s*\|$',  # Branding line
+    r'^:.*:$'                          # Header lines with only colons
+]
+
+# Box drawing and symbols replaced with text. The telephone emoji used to be
+# listed as a surrogate pair, which never matches decoded text, so it is left
+# out and the emoji is kept as before.
+UNICODE_REPLACEMENTS = (
+    ("\u251c\u2500\u2500", "-->"),  # box drawing for branching
+    ("\u2514\u2500\u2500", "-->"),  # box drawing for end branch
+    ("\u2714", "Valid"),            # check mark symbol
+    ("\ufe0f", ""),                 # variation selector (remove if found)
+)
+
+
+def clean_ansi_sequences(text):
+    return ANSI_ESCAPE.sub('', text)
+
+
+def replace_unicode_symbols(line):
+    # Every symbol is non-ASCII, so plain ASCII lines (most URLs) need no work.
+    # str.replace beats a str.translate table here: translate looks up every
+    # character of these long lines one at a time.
+    if line.isascii():
+        return line
+    for symbol, replacement in UNICODE_REPLACEMENTS:
+        line = line.replace(symbol, replacement)
+    return line
+
+
+class SectionParser:
+    """Turn a tool's text report into {section: [lines]} in a single pass.
+
+    Unwanted-line patterns are joined into one alternation compiled once per
+    parser, and lines before the first section header go to "General".
+    """
+
+    def __init__(self, unwanted_patterns=DEFAULT_UNWANTED_PATTERNS, section_markers=("Results for", "Social media")):
+        self.unwanted = re.compile("|".join(f"(?:{pattern})" for pattern in unwanted_patterns))
+        self.section_markers = section_markers
+
+    def is_section_header(self, line):
+        for marker in self.section_markers:
+            if marker in line:
+                return True
+        return False
+
+    def filter_lines(self, lines):
+        filtered_lines = []
+        for line in lines:
+            line = line.strip()
+            if self.unwanted.match(line):
+                continue
+            filtered_lines.append(replace_unicode_symbols(line))
+        return filtered_lines
+
+    def parse(self, output_text):
+        sections = {}
+        current_section = None
+
+        for line in self.filter_lines(clean_ansi_sequences(output_text).splitlines()):
+            line = line.strip()
+            if self.is_section_header(line):
+                current_section = line.replace("Results for ", "").replace(":", "")
+                sections[current_section] = []
+            elif not line:
+                continue
+            elif current_section:
+                sections[current_section].append(line)
+            else:
+                sections.setdefault("General", []).append(line)
+        return sections
+
+
+# Parsers per tool; tools without their own parser use the default one
+PARSERS = {}
+default_parser = SectionParser()
+
+
+def register_parser(tool_name, parser):
+    PARSERS[tool_name] = parser
+
+
+def parse_tool_output(tool_name, content):
+    """Parse a tool's raw output: JSON as is, text through the tool's parser."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return PARSERS.get(tool_name, default_parser).parse(content)
+
+
+def load_tool_output(tool_name, output_file):
+    """Load and parse a tool's output file."""
+    try:
+        with open(output_file, 'r') as f:
+            return parse_tool_output(tool_name, f.read())
+    except FileNotFoundError:
+        print(f"File {output_file} not found.")
+        return {"error": "Data not available or failed to load."}
+
+
+register_parser("phoneinfoga", SectionParser())
+register_parser("phunter", SectionParser())
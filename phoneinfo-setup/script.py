@@ -1,11 +1,18 @@
 import os
 import re
 import json
+import time
 import shutil
+import signal
 import subprocess
+import urllib.error
+import urllib.request
 
-# Directory for storing individual tool outputs
-output_directory = './phone_outputs/'
+from phone_parsers import load_tool_output
+
+# Directory for storing individual tool outputs, kept inside the job's folder
+# so a reused container never picks up a previous job's files
+output_directory = os.path.abspath(os.path.join(os.getenv("OUTPUT_DIR", "."), "phone_outputs"))
 os.makedirs(output_directory, exist_ok=True)
 
 # Check if Phunter directory exists
@@ -22,112 +29,130 @@ def validate_phone_number(phone_number):
         print("Invalid phone number format. Ensure it starts with '+' followed by country code and 10-15 digits.")
         return False
 
-# Function to remove ANSI escape sequences from output
-def clean_ansi_sequences(text):
-    ansi_escape = re.compile(r'\x1B[@-_][0-?]*[ -/]*[@-~]')
-    return ansi_escape.sub('', text)
-
-# Function to replace specific unwanted Unicode characters and emoji with text equivalents
-def replace_unicode_symbols(line):
-    replacements = {
-        "\u251c\u2500\u2500": "-->",
-        "\u2514\u2500\u2500": "-->",
-        "\u2714": "Valid",
-        "\ud83d\udcde": "Phone Number:",
-        "\ufe0f": "",
-    }
-    for unicode_char, replacement in replacements.items():
-        line = line.replace(unicode_char, replacement)
-    return line
-
-def filter_unwanted_data(lines):
-    filtered_lines = []
-    unwanted_patterns = [
-        r'^\s*[_]+',
-        r'^\s*[\(\)]',
-        r'^`-.-\' \\\)\\-\`\\( , o o\\)',
-        r'^`-    \\\`_`\"\'-',
-        r'^`-\(-\'$',
-        r'by Norze',
-        r'^\|\s*Phone number OSINT Tool\s*\|$',
-        r'^:.*:$'
-    ]
-    regex_patterns = [re.compile(pattern) for pattern in unwanted_patterns]
-
-    for line in lines:
-        line = line.strip()
-        if any(regex.match(line) for regex in regex_patterns):
-            continue
-        line = replace_unicode_symbols(line)
-        filtered_lines.append(line)
-    
-    return filtered_lines
-
-# Function to format output by grouping URLs and other results into sections
-def format_output(output_text):
-    sections = {}
-    current_section = None    
-
-    filtered_lines = filter_unwanted_data(output_text.splitlines())
-
-    for line in filtered_lines:
-        if "Results for" in line or "Social media" in line:
-            current_section = line.strip().replace("Results for ", "").replace(":", "")
-            sections[current_section] = []
-        elif line.startswith("URL:") and current_section:
-            sections[current_section].append(line.strip())
-        elif line.strip():
-            if current_section:
-                sections[current_section].append(line.strip())
-            else:
-                sections["General"] = sections.get("General", []) + [line.strip()]
-    return sections
-
-# Prompt user for the phone number
-phone_number = input("Enter the phone number (with country code, e.g., +919726600474): ")
+# Take the phone number from PHONE_NUMBER, or prompt the user for it
+phone_number = os.getenv("PHONE_NUMBER") or input("Enter the phone number (with country code, e.g., +919726600474): ")
 
 # Validate the phone number
 if not validate_phone_number(phone_number):
     exit("Phone number is invalid. Please try again with a valid number.")
 
+# Each tool has a deadline in seconds, overridable with <NAME>_TIMEOUT
+tool_timeouts = {
+    "phoneinfoga": int(os.getenv("PHONEINFOGA_TIMEOUT", "120")),
+    "phunter": int(os.getenv("PHUNTER_TIMEOUT", "120")),
+}
+
+# Absolute deadline of the whole scan (epoch seconds) set by app.py. Tools are
+# cut off early enough to leave merge_reserve seconds for writing the result.
+scan_deadline = float(os.getenv("SCAN_DEADLINE") or 0)
+merge_reserve = float(os.getenv("MERGE_RESERVE_SECONDS", "10"))
+
+# Function to shorten a tool's timeout to what is left before the scan deadline
+def tool_timeout(timeout):
+    if not scan_deadline:
+        return timeout, False
+    remaining = scan_deadline - merge_reserve - time.time()
+    if remaining < timeout:
+        return max(0.0, remaining), True
+    return timeout, False
+
+# app.py's rate limiter, shared by every container calling the same upstream APIs
+rate_limit_url = os.getenv("RATE_LIMIT_URL", "").rstrip("/")
+
+# Function to ask the rate limiter for an upstream API token, retrying until the timeout.
+# Runs unlimited when no limiter is configured or it cannot be reached.
+def acquire_api_token(api, timeout):
+    if not rate_limit_url:
+        return True
+    give_up = time.monotonic() + timeout
+    while True:
+        wait = max(0.0, min(30.0, give_up - time.monotonic()))
+        request = urllib.request.Request(f"{rate_limit_url}/{api}/acquire?wait={wait:.1f}", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=wait + 10):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                print(f"Rate limiter answered {e.code} for {api}, running without it")
+                return True
+            body = json.loads(e.read() or b"{}")
+            if body.get("quota_exhausted") or time.monotonic() >= give_up:
+                return False
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Rate limiter unreachable ({e}), running {api} without it")
+            return True
+
+# Function to run a shell command, killing it and its children once the timeout passes
+def run_command(command, timeout):
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, start_new_session=True)
+    try:
+        _, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise
+    return process.returncode, stderr
+
 # Define tool commands and expected output paths
 tools = {
     "phoneinfoga": {
         "command": f"NUMVERIFY_API_KEY=eGNYXAZqCxQfjJBfrbOjRIMzIT3mYHMC phoneinfoga scan -n {phone_number} > {output_directory}/phoneinfoga_output.txt",
-        "output_file": f"{output_directory}/phoneinfoga_output.txt"
+        "output_file": f"{output_directory}/phoneinfoga_output.txt",
+        "api": "numverify"
     },
     "phunter": {
-        "command": f"cd {phunter_dir} && . venv/bin/activate && python3 phunter.py -t {phone_number} > ../{output_directory}/phunter_output.txt && deactivate",
+        "command": f"cd {phunter_dir} && venv/bin/python phunter.py -t {phone_number} > {output_directory}/phunter_output.txt",
         "output_file": f"{output_directory}/phunter_output.txt"
     }
 }
 
-# Run each tool and capture the output
+# SCAN_TOOLS (comma separated) limits a rescan to the tools whose results are stale
+requested_tools = [name for name in os.getenv("SCAN_TOOLS", "").split(",") if name]
+if requested_tools:
+    tools = {name: config for name, config in tools.items() if name in requested_tools}
+
+# Run each tool and capture the output, timing each one for app.py
+stage_started = time.monotonic()
+statuses = []
 for tool_name, config in tools.items():
+    started = time.monotonic()
+    status = {"tool": tool_name, "status": "ok", "error": None}
+    timeout, shortened = tool_timeout(tool_timeouts[tool_name])
+    if timeout <= 0:
+        status.update(status="deadline", error="Scan deadline passed before the tool started", duration=0.0)
+        statuses.append(status)
+        print(f"Skipping {tool_name}: the scan deadline has passed")
+        continue
+    # Tools sharing an API key wait for a token; part of the timeout goes to that wait
+    if config.get("api") and not acquire_api_token(config["api"], timeout):
+        status.update(status="rate_limited", error=f"No {config['api']} API token available",
+                      duration=round(time.monotonic() - started, 3))
+        statuses.append(status)
+        print(f"Skipping {tool_name}: no {config['api']} API token available")
+        continue
+    timeout = max(1.0, timeout - (time.monotonic() - started))
     print(f"Running {tool_name}...")
     try:
-        result = subprocess.run(config["command"], shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Error running {tool_name}: {result.stderr}")
+        returncode, stderr = run_command(config["command"], timeout)
+        if returncode != 0:
+            status["status"] = "failed"
+            status["error"] = stderr
+            print(f"Error running {tool_name}: {stderr}")
         else:
             print(f"{tool_name} completed successfully.")
+    except subprocess.TimeoutExpired:
+        # "deadline" means the scan ran out of time, not that the tool hung
+        status["status"] = "deadline" if shortened else "timeout"
+        status["error"] = f"Stopped after {round(timeout, 1)}s"
+        print(f"{tool_name} {status['error']}")
     except Exception as e:
+        status["status"] = "failed"
+        status["error"] = str(e)
         print(f"Exception occurred while running {tool_name}: {str(e)}")
-
-# Function to load tool output and convert it to JSON if needed, cleaning ANSI sequences if text
-def load_output_as_json(output_file):
-    try:
-        with open(output_file, 'r') as f:
-            content = f.read()
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                cleaned_content = clean_ansi_sequences(content)
-                formatted_content = format_output(cleaned_content)
-                return formatted_content
-    except FileNotFoundError:
-        print(f"File {output_file} not found.")
-        return {"error": "Data not available or failed to load."}
+    status["duration"] = round(time.monotonic() - started, 3)
+    statuses.append(status)
+stages = {"tools": round(time.monotonic() - stage_started, 3)}
 
 # Function to clean and format JSON data for readability
 def format_json(data):
@@ -140,13 +165,14 @@ consolidated_data = {
 }
 
 # Load each tool's output and add it to the consolidated data
+stage_started = time.monotonic()
 for tool_name, config in tools.items():
-    tool_data = load_output_as_json(config["output_file"])
+    tool_data = load_tool_output(tool_name, config["output_file"])
     consolidated_data["tools_results"][tool_name] = tool_data
 
 # Save consolidated data to the output directory
 output_file = f"{phone_number}.json"
-destination_dir = "/app/output"
+destination_dir = os.getenv("OUTPUT_DIR", "/app/output")  # Per-job folder set by app.py
 os.makedirs(destination_dir, exist_ok=True)
 final_output_path = os.path.join(destination_dir, output_file)
 
@@ -154,4 +180,12 @@ final_output_path = os.path.join(destination_dir, output_file)
 with open(final_output_path, 'w') as f:
     json.dump(consolidated_data, f, indent=4)
 
+stages["merge"] = round(time.monotonic() - stage_started, 3)
+
+# Leave the per-tool status and stage timings for app.py next to the result
+with open(os.path.join(destination_dir, "_tool_status.json"), "w", encoding="utf-8") as status_file:
+    json.dump(statuses, status_file, indent=4)
+with open(os.path.join(destination_dir, "_timings.json"), "w", encoding="utf-8") as timings_file:
+    json.dump({"stages": stages}, timings_file, indent=4)
+
 print(f"Consolidated and formatted results saved to {final_output_path}")
@@ -0,0 +1,204 @@
+import re
+import threading
+import time
+import uuid
+
+from result_cache import normalize_input
+
+# Phone numbers written with a country code, e.g. "+91 97734 81532" or "+1 (555) 010-9999"
+PHONE_PATTERN = re.compile(r"(?<![\w+])\+\d[\d\s().-]{8,20}\d")
+VALID_PHONE = re.compile(r"^\+\d{10,15}$")
+VALID_USERNAME = re.compile(r"^[a-z0-9._-]{2,40}$")
+
+
+# The local part of an email is often reused as a username ("+tags" dropped)
+def email_username(email, result=None):
+    local_part = email.split("@", 1)[0].split("+", 1)[0]
+    username = normalize_input("username", local_part)
+    return [("username", username, "email local part")] if VALID_USERNAME.match(username) else []
+
+
+def result_strings(result):
+    if isinstance(result, str):
+        yield result
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            yield from result_strings(key)
+            yield from result_strings(value)
+    elif isinstance(result, list):
+        for value in result:
+            yield from result_strings(value)
+
+
+# Phone numbers mentioned anywhere in a merged result
+def result_phones(target, result):
+    phones = []
+    for text in result_strings(result):
+        for match in PHONE_PATTERN.findall(text):
+            try:
+                phone = normalize_input("phone", match)
+            except ValueError:
+                continue
+            if VALID_PHONE.match(phone) and phone not in phones:
+                phones.append(phone)
+    return [("phone", phone, "found in result") for phone in phones]
+
+
+# Pivots known from the input alone run alongside the scan they come from;
+# result pivots wait for it
+INPUT_PIVOTS = {
+    "email": [email_username],
+}
+RESULT_PIVOTS = {
+    "email": [result_phones],
+    "username": [result_phones],
+}
+
+
+class PivotOrchestrator:
+    """Scan a target and the entities it leads to as a graph.
+
+    Each node is an (entity, input) scan. Edges come from INPUT_PIVOTS as soon
+    as a node is added and from RESULT_PIVOTS once its result is in. Nodes are
+    submitted to the job queue as soon as they are found, so independent branches
+    run concurrently. Cached results are used without scanning, and each target
+    appears once however many edges lead to it.
+    """
+
+    def __init__(self, job_queue, max_depth=2, max_nodes=25, retention=3600, coalesce_key=None):
+        self.job_queue = job_queue
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.retention = retention
+        # Lets pivot scans join identical lookups already under way
+        self.coalesce_key = coalesce_key
+        self.pivots = {}
+        self.lock = threading.Lock()
+
+    def create(self, entity, input_value, depth=None, lookup_cached=None, full=False):
+        """Start a pivot from a normalized input and return its id.
+
+        With full, every scan reruns all its tools instead of reusing fresh stored output.
+        """
+        pivot_id = uuid.uuid4().hex
+        pivot = {
+            "id": pivot_id,
+            "root": f"{entity}:{input_value}",
+            "max_depth": self.max_depth if depth is None else min(depth, self.max_depth),
+            "created_at": time.time(),
+            "finished_at": None,
+            "truncated": False,
+            "nodes": {},
+            "edges": [],
+            "lookup_cached": lookup_cached,
+            "full": full,
+        }
+        with self.lock:
+            self._prune()
+            self.pivots[pivot_id] = pivot
+        self._add_nodes(pivot, [(None, entity, input_value, None, 0)])
+        return pivot_id
+
+    def _add_nodes(self, pivot, found, finished=None):
+        """Add (parent key, entity, input, via, depth) nodes and submit their scans.
+
+        finished is (key, job) of the scan the nodes were found in; it is marked
+        done under the same lock so the pivot never looks finished in between.
+        """
+        to_scan = []
+        with self.lock:
+            if finished:
+                self._record(pivot, *finished)
+            while found:
+                parent, entity, input_value, via, depth = found.pop(0)
+                key = f"{entity}:{input_value}"
+                if key not in pivot["nodes"]:
+                    if len(pivot["nodes"]) >= self.max_nodes:
+                        pivot["truncated"] = True
+                        continue
+                    node = {"entity": entity, "input": input_value, "depth": depth, "status": "pending",
+                            "job_id": None, "cached": False, "result": None, "error": None}
+                    pivot["nodes"][key] = node
+                    if depth < pivot["max_depth"]:
+                        for pivot_fn in INPUT_PIVOTS.get(entity, []):
+                            found += [(key, *edge, depth + 1) for edge in pivot_fn(input_value)]
+                    cached = pivot["lookup_cached"](entity, input_value) if pivot["lookup_cached"] else None
+                    if cached is not None:
+                        node.update(status="done", cached=True, result=cached)
+                        found += self._result_edges(pivot, key, node)
+                    else:
+                        node["status"] = "queued"
+                        to_scan.append(key)
+                if parent is not None:
+                    pivot["edges"].append({"from": parent, "to": key, "via": via})
+            self._check_finished(pivot)
+
+        for key in to_scan:
+            node = pivot["nodes"][key]
+            coalesce_key = (
+                self.coalesce_key(node["entity"], node["input"], pivot["full"]) if self.coalesce_key else None
+            )
+            job_id = self.job_queue.submit(
+                node["entity"], node["input"], coalesce_key=coalesce_key, full=pivot["full"]
+            )
+            node["job_id"] = job_id
+            self.job_queue.add_done_callback(job_id, lambda job, key=key: self._finished(pivot, key, job))
+
+    def _record(self, pivot, key, job):
+        node = pivot["nodes"][key]
+        if job["status"] == "done":
+            node.update(status="done", result=job["result"])
+        else:
+            node.update(status="failed", error=job["error"] or job["status"])
+
+    def _finished(self, pivot, key, job):
+        node = dict(pivot["nodes"][key], result=job["result"])
+        found = self._result_edges(pivot, key, node) if job["status"] == "done" else []
+        self._add_nodes(pivot, found, finished=(key, job))
+
+    def _result_edges(self, pivot, key, node):
+        # Entities found in a node's result, one level deeper
+        if node["depth"] >= pivot["max_depth"] or not isinstance(node["result"], dict):
+            return []
+        return [
+            (key, entity, value, via, node["depth"] + 1)
+            for pivot_fn in RESULT_PIVOTS.get(node["entity"], [])
+            for entity, value, via in pivot_fn(node["input"], node["result"])
+            if f"{entity}:{value}" != key
+        ]
+
+    def _check_finished(self, pivot):
+        if all(node["status"] in ("done", "failed") for node in pivot["nodes"].values()):
+            pivot["finished_at"] = pivot["finished_at"] or time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for pivot_id in [pivot_id for pivot_id, pivot in self.pivots.items()
+                         if pivot["finished_at"] and pivot["finished_at"] < cutoff]:
+            del self.pivots[pivot_id]
+
+    def get(self, pivot_id, include_results=True):
+        """Return the pivot graph: nodes keyed "entity:input", edges and progress counts."""
+        with self.lock:
+            pivot = self.pivots.get(pivot_id)
+            if pivot is None:
+                return None
+            counts = {"pending": 0, "queued": 0, "done": 0, "failed": 0}
+            nodes = {}
+            for key, node in pivot["nodes"].items():
+                counts[node["status"]] += 1
+                node = dict(node)
+                if not include_results:
+                    node.pop("result")
+                nodes[key] = node
+            return {
+                "id": pivot_id,
+                "root": pivot["root"],
+                "max_depth": pivot["max_depth"],
+                "created_at": pivot["created_at"],
+                "finished_at": pivot["finished_at"],
+                "truncated": pivot["truncated"],
+                "progress": counts,
+                "nodes": nodes,
+                "edges": list(pivot["edges"]),
+            }
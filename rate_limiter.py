@@ -0,0 +1,95 @@
+import threading
+import time
+
+
+# Seconds until the next UTC midnight, when daily quotas reset
+def seconds_until_tomorrow(now=None):
+    now = now or time.time()
+    return 86400 - now % 86400
+
+
+class TokenBucket:
+    """Tokens refilled at rate_per_minute up to burst, with an optional daily quota (0 = none)."""
+
+    def __init__(self, rate_per_minute, burst, daily_quota=0):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.day = int(time.time() // 86400)
+        self.used_today = 0
+        self.granted = 0
+        self.denied = 0
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        day = int(time.time() // 86400)
+        if day != self.day:
+            self.day = day
+            self.used_today = 0
+
+    def quota_exhausted(self, tokens=1):
+        with self.condition:
+            self._refill()
+            return bool(self.daily_quota) and self.used_today + tokens > self.daily_quota
+
+    def acquire(self, tokens=1, timeout=0):
+        """Take tokens, waiting up to timeout seconds. Returns (granted, seconds to retry after)."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self._refill()
+                if self.daily_quota and self.used_today + tokens > self.daily_quota:
+                    self.denied += 1
+                    return False, seconds_until_tomorrow()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.used_today += tokens
+                    self.granted += 1
+                    return True, 0.0
+                needed = (tokens - self.tokens) / self.rate if self.rate else float("inf")
+                # Give up now rather than wait for a token that comes too late
+                if needed > deadline - time.monotonic():
+                    self.denied += 1
+                    return False, needed
+                self.condition.wait(needed)
+
+    def stats(self):
+        with self.condition:
+            self._refill()
+            return {
+                "rate_per_minute": self.rate * 60,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "daily_quota": self.daily_quota,
+                "used_today": self.used_today,
+                "remaining_today": self.daily_quota - self.used_today if self.daily_quota else None,
+                "resets_in": round(seconds_until_tomorrow()),
+                "granted": self.granted,
+                "denied": self.denied,
+            }
+
+
+class RateLimiter:
+    """One token bucket per upstream API, shared by every job and container."""
+
+    def __init__(self, limits):
+        self.buckets = {api: TokenBucket(**limit) for api, limit in limits.items()}
+
+    def acquire(self, api, tokens=1, timeout=0):
+        """Take tokens for api; APIs without a bucket are not limited."""
+        bucket = self.buckets.get(api)
+        if bucket is None:
+            return True, 0.0
+        return bucket.acquire(tokens, timeout)
+
+    def quota_exhausted(self, api):
+        bucket = self.buckets.get(api)
+        return bucket is not None and bucket.quota_exhausted()
+
+    def stats(self):
+        return {api: bucket.stats() for api, bucket in self.buckets.items()}
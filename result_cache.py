@@ -0,0 +1,103 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# E.164: "+" then 8 to 15 digits
+VALID_PHONE = re.compile(r"^\+\d{8,15}$")
+
+
+# Normalize an input value so equivalent lookups share one cache key
+def normalize_input(entity, input_value):
+    """Canonical form of an input, so equivalent lookups share cache entries.
+
+    Raises ValueError for a phone number that is not E.164 after removing
+    separators, including one without a country code, which cannot be told
+    apart from a national number.
+    """
+    value = str(input_value).strip()
+    if entity == "email":
+        return value.lower()
+    if entity == "phone":
+        # E.164: "+" followed by digits only, "00" international prefix becomes "+"
+        value = re.sub(r"[\s\-().]", "", value)
+        if value.startswith("00"):
+            value = "+" + value[2:]
+        elif not value.startswith("+"):
+            raise ValueError("Phone numbers need their country code, e.g. +919773481532")
+        if not VALID_PHONE.match(value):
+            raise ValueError("Phone numbers must be a country code and number, e.g. +919773481532")
+        return value
+    if entity == "username":
+        return value.lstrip("@").lower()
+    return value
+
+
+class ResultCache:
+    """Size-bounded LRU cache of scan results with a TTL per entity type."""
+
+    def __init__(self, ttls, max_entries=256):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, entity, input_value):
+        """Return the cached result, or None if it is missing or expired."""
+        entry = self.lookup(entity, input_value)
+        return entry[0] if entry else None
+
+    def lookup(self, entity, input_value):
+        """Return (result, time it was cached), or None if it is missing or expired."""
+        key = (entity, input_value)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def peek(self, entity, input_value):
+        """Like lookup, but leaves the hit/miss counters and the LRU order alone."""
+        with self.lock:
+            entry = self.entries.get((entity, input_value))
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1], entry[2]
+
+    def put(self, entity, input_value, result):
+        ttl = self.ttls.get(entity, 0)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (entity, input_value)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, result, time.time())
+            self.entries.move_to_end(key)
+            # Evict least recently used entries once over capacity
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, entity, input_value):
+        with self.lock:
+            self.entries.pop((entity, input_value), None)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "ttl_seconds": dict(self.ttls),
+            }
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT,
+    entity TEXT NOT NULL,
+    target TEXT NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    entity TEXT NOT NULL,
+    target TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    site TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    breach TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    url TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    scan_id INTEGER REFERENCES scans(id),
+    UNIQUE (entity, target, tool, site, breach)
+);
+CREATE TABLE IF NOT EXISTS tool_outputs (
+    entity TEXT NOT NULL,
+    target TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (entity, target, tool)
+);
+CREATE INDEX IF NOT EXISTS findings_site ON findings (site);
+CREATE INDEX IF NOT EXISTS findings_breach ON findings (breach);
+CREATE INDEX IF NOT EXISTS findings_target ON findings (target);
+CREATE INDEX IF NOT EXISTS scans_target ON scans (entity, target);
+"""
+
+
+# Pull (tool, site, breach, url) findings out of a merged email result
+def email_findings(target, result):
+    for filename, data in result.items():
+        if filename.startswith("holehe_") and isinstance(data, list):
+            for row in data:
+                if row.get("exists") == "True":
+                    yield "holehe", row.get("domain") or row.get("name", ""), "", None
+        elif filename == "mailleaks.json" and isinstance(data, dict):
+            for breach in data.get("breaches") or []:
+                yield "breach-checker", "", breach.get("name", ""), None
+        elif filename == f"{target}.json" and isinstance(data, dict):
+            for entry in data.get("result") or []:
+                yield "breachcheck", "", entry.get("sources", ""), None
+
+
+# Pull (tool, site, breach, url) findings out of a merged username result
+def username_findings(target, result):
+    for filename, data in result.items():
+        if "blackbird" in filename and isinstance(data, list):
+            for row in data:
+                yield "blackbird", row.get("name", ""), "", row.get("url")
+        elif (filename.startswith("maigret_") or filename.endswith("_simple.json")) and isinstance(data, dict):
+            for site, entry in data.items():
+                status = entry.get("status") or {}
+                if status.get("status") == "Claimed":
+                    yield "maigret", site, "", entry.get("url_user")
+        elif filename == f"{target}.csv" and isinstance(data, list):
+            for row in data:
+                if row.get("exists") == "Claimed":
+                    yield "sherlock", row.get("name", ""), "", row.get("url_user")
+        elif filename.startswith("socialscan_") and isinstance(data, dict):
+            for rows in data.values():
+                for row in rows:
+                    # Taken by someone (valid query, not available) means the account exists
+                    if row.get("success") == "True" and row.get("valid") == "True" and row.get("available") == "False":
+                        yield "socialscan", row.get("platform", ""), "", row.get("link")
+
+
+FINDING_EXTRACTORS = {
+    "email": email_findings,
+    "username": username_findings,
+}
+
+
+class ResultStore:
+    """SQLite index of scan findings, one row per (target, tool, site/breach)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers run while a scan is being recorded
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def record_scan(self, job_id, entity, target, result):
+        """Store a finished scan and upsert its findings. Returns the number of findings."""
+        extractor = FINDING_EXTRACTORS.get(entity)
+        findings = set(extractor(target, result)) if extractor and isinstance(result, dict) else set()
+        now = time.time()
+        with self._connect() as connection:
+            scan_id = connection.execute(
+                "INSERT INTO scans (job_id, entity, target, scanned_at) VALUES (?, ?, ?, ?)",
+                (job_id, entity, target, now)
+            ).lastrowid
+            connection.executemany(
+                """
+                INSERT INTO findings (entity, target, tool, site, breach, url, first_seen, last_seen, scan_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (entity, target, tool, site, breach) DO UPDATE SET
+                    url = excluded.url, last_seen = excluded.last_seen, scan_id = excluded.scan_id
+                """,
+                [(entity, target, tool, site, breach, url, now, now, scan_id)
+                 for tool, site, breach, url in findings]
+            )
+        return len(findings)
+
+    def query(self, site=None, breach=None, target=None, tool=None, entity=None, limit=100, offset=0):
+        """Return findings matching every given filter (site and breach ignore case)."""
+        filters = {"site": site, "breach": breach, "target": target, "tool": tool, "entity": entity}
+        where = [f"{column} = ?" for column, value in filters.items() if value]
+        params = [value for value in filters.values() if value]
+        sql = "SELECT entity, target, tool, site, breach, url, first_seen, last_seen FROM findings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY last_seen DESC LIMIT ? OFFSET ?"
+        rows = self._connect().execute(sql, params + [limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_tool_outputs(self, entity, target, fragments):
+        """Keep the latest output of each tool ({tool: data}) for a target."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO tool_outputs (entity, target, tool, scanned_at, data) VALUES (?, ?, ?, ?, ?)",
+                [(entity, target, tool, now, json.dumps(data)) for tool, data in fragments.items()]
+            )
+
+    def tool_outputs(self, entity, target):
+        """Return {tool: {"scanned_at", "data"}} with the latest output of each tool for a target."""
+        rows = self._connect().execute(
+            "SELECT tool, scanned_at, data FROM tool_outputs WHERE entity = ? AND target = ?",
+            (entity, target)
+        ).fetchall()
+        return {row["tool"]: {"scanned_at": row["scanned_at"], "data": json.loads(row["data"])} for row in rows}
+
+    def scans(self, entity, target, limit=20):
+        """Return the most recent scans of a target."""
+        rows = self._connect().execute(
+            "SELECT job_id, entity, target, scanned_at FROM scans WHERE entity = ? AND target = ? "
+            "ORDER BY scanned_at DESC LIMIT ?",
+            (entity, target, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
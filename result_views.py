@@ -0,0 +1,134 @@
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from tool_outputs import split_by_tool, merge_tool_outputs
+
+# Brotli is optional; without it clients are offered gzip only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def result_etag(entity, target, version, query):
+    """Strong ETag of one view of a stored result, computed without rendering it."""
+    digest = hashlib.sha1(json.dumps([entity, target, version, query]).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def select_tools(entity, target, result, tools):
+    """Keep only the output of the given tools."""
+    fragments = split_by_tool(entity, target, result)
+    return merge_tool_outputs(entity, target, {tool: data for tool, data in fragments.items() if tool in tools})
+
+
+def is_record_map(value):
+    # maigret reports are {site: record}; they are paged like lists
+    return isinstance(value, dict) and len(value) > 1 and all(isinstance(item, dict) for item in value.values())
+
+
+def collections(result, path=()):
+    """Yield (path, value) for every per-tool array or record map in a result."""
+    # The phone result groups the tools under "tools_results"
+    if not path and isinstance(result.get("tools_results"), dict):
+        for tool, output in result["tools_results"].items():
+            yield from collections(output, ("tools_results", tool))
+    elif isinstance(result, list) or (path and is_record_map(result)):
+        yield path, result
+    elif isinstance(result, dict) and len(path) < 3:
+        for key, value in result.items():
+            yield from collections(value, path + (key,))
+
+
+def set_path(result, path, value):
+    for key in path[:-1]:
+        result = result[key]
+    result[path[-1]] = value
+
+
+def copy_path(result, path):
+    # Copy the dicts along path so the cached result is never modified
+    result = dict(result)
+    node = result
+    for key in path[:-1]:
+        node[key] = dict(node[key])
+        node = node[key]
+    return result
+
+
+def select_fields(records, fields):
+    if isinstance(records, dict):
+        return {key: select_fields([record], fields)[0] for key, record in records.items()}
+    return [
+        {key: value for key, value in record.items() if key in fields} if isinstance(record, dict) else record
+        for record in records
+    ]
+
+
+def shape_result(result, fields=None, offset=0, limit=None):
+    """Trim each per-tool collection to the page and to the given record fields.
+
+    Returns the trimmed result and {collection path: total items}.
+    """
+    totals = {}
+    if not isinstance(result, dict):
+        return result, totals
+    for path, records in list(collections(result)):
+        totals["/".join(map(str, path))] = len(records)
+        if limit is not None or offset:
+            end = None if limit is None else offset + limit
+            if isinstance(records, dict):
+                records = dict(list(records.items())[offset:end])
+            else:
+                records = records[offset:end]
+        if fields:
+            records = select_fields(records, fields)
+        result = copy_path(result, path)
+        set_path(result, path, records)
+    return result, totals
+
+
+def encode_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def supported_encodings():
+    return ["br", "gzip", "identity"] if brotli else ["gzip", "identity"]
+
+
+class RenderedViews:
+    """LRU of rendered, compressed result views keyed by (ETag, encoding), so
+    repeat views from other clients are not serialized and compressed again.
+
+    render() returns (JSON body bytes, extra response headers).
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, etag, encoding, render):
+        key = (etag, encoding)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        if encoding == "identity":
+            entry = render()
+        else:
+            body, headers = self.get(etag, "identity", render)
+            entry = encode_body(body, encoding), headers
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
@@ -0,0 +1,75 @@
+import time
+
+
+# Which tool wrote a file of a merged email result
+def email_tool(target, filename):
+    if filename == "mailleaks.json":
+        return "Breach-Checker"
+    if filename.startswith("holehe_"):
+        return "Holehe"
+    if filename == f"{target}.json":
+        return "BreachCheck"
+    return None
+
+
+# Which tool wrote a file of a merged username result
+def username_tool(target, filename):
+    if filename.startswith("maigret_") or filename.endswith("_simple.json"):
+        return "maigret"
+    if filename == f"{target}.csv":
+        return "sherlock"
+    if filename.startswith("socialscan_"):
+        return "socialscan"
+    if filename.startswith("blackbird"):
+        return "blackbird"
+    return None
+
+
+FILE_TOOLS = {
+    "email": email_tool,
+    "username": username_tool,
+}
+
+
+def split_by_tool(entity, target, result):
+    """Split a combined scan result into {tool: the part of the result that tool produced}."""
+    if not isinstance(result, dict):
+        return {}
+    # The phone script already groups its output by tool
+    if entity == "phone":
+        return {tool: data for tool, data in (result.get("tools_results") or {}).items()}
+    fragments = {}
+    for filename, data in result.items():
+        tool = FILE_TOOLS[entity](target, filename)
+        if tool:
+            fragments.setdefault(tool, {})[filename] = data
+    return fragments
+
+
+def merge_tool_outputs(entity, target, fragments):
+    """Build a combined scan result, shaped like the container's, from per-tool parts."""
+    if entity == "phone":
+        return {"phone_number": target, "tools_results": dict(fragments)}
+    combined = {}
+    for data in fragments.values():
+        combined.update(data)
+    return combined
+
+
+def fresh_tools(stored, freshness, now=None):
+    """Tools whose stored output ({tool: {"scanned_at", "data"}}) is still within its freshness window."""
+    now = now or time.time()
+    return {
+        tool for tool, output in stored.items()
+        if tool in freshness and now - output["scanned_at"] < freshness[tool]
+    }
+
+
+def ok_tools(statuses, name=None):
+    """Tools that finished cleanly according to _tool_status.json, for one input of a grouped run."""
+    ok = set()
+    for status in statuses:
+        tool, _, tool_input = status["tool"].partition(":")
+        if status["status"] == "ok" and (not tool_input or tool_input == name):
+            ok.add(tool)
+    return ok
@@ -1,56 +1,186 @@
 import os
+import json
+import time
+import signal
 import subprocess
 import shutil
 import glob
+import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Get username input from the user
-username = input("Enter the username to search: ")
+# USERNAMES (comma separated) scans several usernames in one run; otherwise take
+# the username from the USERNAME environment variable, or ask the user
+usernames = [name for name in os.getenv("USERNAMES", "").split(",") if name]
+username = usernames[0] if usernames else (os.getenv("USERNAME") or input("Enter the username to search: "))
+grouped = len(usernames) > 1
 
 # Define output directories and filenames
-output_dir = "./combined_output"
+output_dir = os.path.abspath(os.getenv("OUTPUT_DIR", "./combined_output"))
 json_output_file = os.path.join(output_dir, f"{username}_combined_output.json")
 
 # Ensure the combined output directory exists
 os.makedirs(output_dir, exist_ok=True)
 
+# How many tools may crawl at the same time
+max_parallel_tools = int(os.getenv("MAX_PARALLEL_TOOLS", "4"))
+
+# Each tool has a deadline in seconds, overridable with <NAME>_TIMEOUT
+tool_timeouts = {
+    "maigret": int(os.getenv("MAIGRET_TIMEOUT", "600")),
+    "sherlock": int(os.getenv("SHERLOCK_TIMEOUT", "300")),
+    "socialscan": int(os.getenv("SOCIALSCAN_TIMEOUT", "120")),
+    "blackbird": int(os.getenv("BLACKBIRD_TIMEOUT", "300")),
+}
+
+# Absolute deadline of the whole scan (epoch seconds) set by app.py. Tools are
+# cut off early enough to leave merge_reserve seconds for merging their output.
+scan_deadline = float(os.getenv("SCAN_DEADLINE") or 0)
+merge_reserve = float(os.getenv("MERGE_RESERVE_SECONDS", "10"))
+
+# Optional shared response cache (PROXY_CACHE=1): every tool goes through
+# cache_proxy.py, so a profile URL probed by several tools is fetched once. The
+# proxy outlives the scan, so a warm container keeps its cache between jobs; run
+# with SCAN_MODE=warm for that, as a one-off container takes its cache with it.
+proxy_port = int(os.getenv("PROXY_CACHE_PORT", "3128"))
+proxy_url = f"http://127.0.0.1:{proxy_port}"
+proxy_stats_before = None
+
+def read_proxy_stats():
+    # Ask the proxy directly, not through itself
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    try:
+        with opener.open(f"{proxy_url}/__stats", timeout=2) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+def start_cache_proxy():
+    stats = read_proxy_stats()
+    if stats is None:
+        proxy_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_proxy.py")
+        subprocess.Popen([sys.executable, proxy_script, str(proxy_port)], start_new_session=True)
+        for _ in range(50):
+            time.sleep(0.2)
+            stats = read_proxy_stats()
+            if stats is not None:
+                break
+    if stats is None:
+        print("Cache proxy did not start, running the tools without it")
+        return None
+    ca_bundle = os.path.join(os.getenv("PROXY_CERT_DIR", "/tmp/cache-proxy"), "ca-bundle.pem")
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
+        os.environ[name] = proxy_url
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "localhost,127.0.0.1"
+    for name in ("SSL_CERT_FILE", "REQUESTS_CA_BUNDLE", "CURL_CA_BUNDLE"):
+        os.environ[name] = ca_bundle
+    print(f"Routing tools through the cache proxy at {proxy_url}")
+    return stats
+
+if os.getenv("PROXY_CACHE", "0") == "1":
+    proxy_stats_before = start_cache_proxy()
+
+# maigret ignores the proxy environment variables, so it is told explicitly
+maigret_proxy = f" --proxy {proxy_url}" if proxy_stats_before is not None else ""
+
+# Each tool runs through its venv's interpreter directly; no bash or activate needed
 commands = [
     {
-        "command": (
-            f"bash -c 'cd maigret && source venv/bin/activate && "
-            f"maigret {username} --json simple --folderoutput .{output_dir} && deactivate'"
-        ),
-        "output_file": f".{output_dir}/maigret_{username}.json"
+        "name": "maigret",
+        "timeout": tool_timeouts["maigret"],
+        "command": f"cd maigret && venv/bin/maigret {username} --json simple --folderoutput {output_dir}{maigret_proxy}",
+        "output_file": os.path.join(output_dir, f"maigret_{username}.json")
     },
     {
+        "name": "sherlock",
+        "timeout": tool_timeouts["sherlock"],
         "command": f"cd sherlock && sherlock {username} --print-found --csv",
         "output_file": f"sherlock/{username}.csv",
         "move_to": os.path.join(output_dir, f"{username}.csv")
     },
     {
-        "command": (
-            f"bash -c 'cd socialscan && source venv/bin/activate && "
-            f"socialscan {username} --json socialscan_{username}.json && deactivate'"
-        ),
+        "name": "socialscan",
+        "timeout": tool_timeouts["socialscan"],
+        "command": f"cd socialscan && venv/bin/socialscan {username} --json socialscan_{username}.json",
         "output_file": f"socialscan/socialscan_{username}.json",
         "move_to": os.path.join(output_dir, f"socialscan_{username}.json")
     },
     {
-        "command": (
-            f"bash -c 'cd blackbird && source venv/bin/activate && "
-            f"python3 blackbird.py -u {username} --csv && deactivate'"
-        ),
+        "name": "blackbird",
+        "timeout": tool_timeouts["blackbird"],
+        "command": f"cd blackbird && venv/bin/python blackbird.py -u {username} --csv",
         "output_pattern": f"blackbird/results/{username}_*/{username}_*.csv",  # Pattern for blackbird output
         "move_to": os.path.join(output_dir, f"blackbird_{username}.csv")
     }
 ]
 
-def run_command(command):
+# Several usernames: maigret, sherlock and socialscan take them all in one
+# invocation (with a deadline scaled to match), blackbird runs once per name.
+# Each username's files end up in <output_dir>/<username>/.
+if grouped:
+    targets = " ".join(usernames)
+    user_dirs = {name: os.path.join(output_dir, name) for name in usernames}
+    for user_dir in user_dirs.values():
+        os.makedirs(user_dir, exist_ok=True)
+
+    commands = [
+        {
+            "name": "maigret",
+            "timeout": tool_timeouts["maigret"] * len(usernames),
+            "command": f"cd maigret && venv/bin/maigret {targets} --json simple --folderoutput {output_dir}{maigret_proxy}",
+            "moves": [
+                (os.path.join(output_dir, f"report_{name}_simple.json"),
+                 os.path.join(user_dirs[name], f"report_{name}_simple.json"))
+                for name in usernames
+            ]
+        },
+        {
+            "name": "sherlock",
+            "timeout": tool_timeouts["sherlock"] * len(usernames),
+            "command": f"cd sherlock && sherlock {targets} --print-found --csv",
+            "moves": [
+                (f"sherlock/{name}.csv", os.path.join(user_dirs[name], f"{name}.csv"))
+                for name in usernames
+            ]
+        },
+        {
+            "name": "socialscan",
+            "timeout": tool_timeouts["socialscan"] * len(usernames),
+            "command": f"cd socialscan && venv/bin/socialscan {targets} --json socialscan_group.json",
+            "split_json": (
+                "socialscan/socialscan_group.json",
+                {name: os.path.join(user_dirs[name], f"socialscan_{name}.json") for name in usernames}
+            )
+        },
+    ] + [
+        {
+            "name": f"blackbird:{name}",
+            "timeout": tool_timeouts["blackbird"],
+            "command": f"cd blackbird && venv/bin/python blackbird.py -u {name} --csv",
+            "output_pattern": f"blackbird/results/{name}_*/{name}_*.csv",
+            "move_to": os.path.join(user_dirs[name], f"blackbird_{name}.csv")
+        }
+        for name in usernames
+    ]
+
+# SCAN_TOOLS (comma separated) limits a rescan to the tools whose results are stale
+requested_tools = [name for name in os.getenv("SCAN_TOOLS", "").split(",") if name]
+if requested_tools:
+    commands = [cmd for cmd in commands if cmd["name"].split(":")[0] in requested_tools]
+
+def run_command(command, timeout):
+    """Run a shell command, killing it and its children once the timeout passes."""
+    print(f"Running command: {command}")
+    process = subprocess.Popen(command, shell=True, start_new_session=True)
     try:
-        print(f"Running command: {command}")
-        subprocess.run(command, shell=True, check=True)
-        print("Command completed successfully.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {e}")
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+        raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    print("Command completed successfully.")
 
 def move_file(source, destination):
     if os.path.exists(source):
@@ -59,10 +189,7 @@ def move_file(source, destination):
     else:
         print(f"Error: Expected output file {source} not found.")
 
-# Run each command and move output files
-for cmd in commands:
-    run_command(cmd["command"])
-    
+def collect_output(cmd):
     # Move Sherlock output to combined folder immediately after it is created
     if "output_file" in cmd and "move_to" in cmd:
         move_file(cmd["output_file"], cmd["move_to"])
@@ -74,4 +201,78 @@ for cmd in commands:
             for match in matches:
                 move_file(match, cmd["move_to"])
 
+    # Grouped runs: hand each username its own copy of the output
+    elif "moves" in cmd:
+        for source, destination in cmd["moves"]:
+            move_file(source, destination)
+
+    elif "split_json" in cmd:
+        source, destinations = cmd["split_json"]
+        if not os.path.exists(source):
+            print(f"Error: Expected output file {source} not found.")
+            return
+        with open(source, encoding="utf-8") as json_file:
+            data = json.load(json_file)
+        for name, destination in destinations.items():
+            with open(destination, "w", encoding="utf-8") as json_file:
+                json.dump({name: data.get(name, [])}, json_file)
+        os.remove(source)
+
+def tool_timeout(timeout):
+    # The tool's own timeout, shortened to what is left before the scan deadline
+    if not scan_deadline:
+        return timeout, False
+    remaining = scan_deadline - merge_reserve - time.time()
+    if remaining < timeout:
+        return max(0.0, remaining), True
+    return timeout, False
+
+def run_tool(cmd):
+    # Run one tool under its deadline, collect its output and report how it went
+    started = time.monotonic()
+    status = {"tool": cmd["name"], "status": "ok", "error": None}
+    timeout, shortened = tool_timeout(cmd["timeout"])
+    if timeout <= 0:
+        status.update(status="deadline", error="Scan deadline passed before the tool started", duration=0.0)
+        return status
+    try:
+        run_command(cmd["command"], timeout)
+    except subprocess.TimeoutExpired:
+        # "deadline" means the scan ran out of time, not that the tool hung
+        status["status"] = "deadline" if shortened else "timeout"
+        status["error"] = f"Stopped after {round(timeout, 1)}s"
+    except subprocess.CalledProcessError as e:
+        status["status"] = "failed"
+        status["error"] = str(e)
+        print(f"Error running command: {e}")
+    # Whatever the tool managed to write is still worth keeping
+    collect_output(cmd)
+    status["duration"] = round(time.monotonic() - started, 3)
+    return status
+
+# Run the tools side by side, collecting each one's output as soon as it finishes
+statuses = []
+with ThreadPoolExecutor(max_workers=max(1, max_parallel_tools)) as executor:
+    futures = [executor.submit(run_tool, cmd) for cmd in commands]
+    for future in as_completed(futures):
+        status = future.result()
+        print(f"{status['tool']} finished with status '{status['status']}' in {status['duration']}s")
+        statuses.append(status)
+
+# Leave the per-tool status next to the outputs; final_op2.py skips "_" files
+with open(os.path.join(output_dir, "_tool_status.json"), "w", encoding="utf-8") as status_file:
+    json.dump(statuses, status_file, indent=4)
+
+# Report how much the cache proxy saved during this scan
+if proxy_stats_before is not None:
+    proxy_stats = read_proxy_stats()
+    if proxy_stats is not None:
+        counters = ("hits", "misses", "coalesced", "uncacheable", "tunnelled", "errors")
+        delta = {name: proxy_stats[name] - proxy_stats_before.get(name, 0) for name in counters}
+        lookups = delta["hits"] + delta["misses"] + delta["coalesced"]
+        delta["hit_rate"] = round((delta["hits"] + delta["coalesced"]) / lookups, 3) if lookups else 0.0
+        print(f"Cache proxy: {delta}")
+        with open(os.path.join(output_dir, "_proxy_stats.json"), "w", encoding="utf-8") as stats_file:
+            json.dump(delta, stats_file, indent=4)
+
 print(f"All output files have been moved to {output_dir}")
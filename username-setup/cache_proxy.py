@@ -0,0 +1,363 @@
+"""Caching forward proxy shared by the username tools.
+
+maigret, sherlock, blackbird and socialscan probe largely the same profile URLs.
+Routed through this proxy, each URL is fetched once: responses are kept for
+PROXY_CACHE_TTL seconds, keyed by method, URL and Accept-Encoding, and identical
+requests arriving while one is in flight wait for its response instead of
+going out again.
+
+HTTPS is intercepted with a local CA (made with the openssl CLI) that the tools
+are told to trust through SSL_CERT_FILE / REQUESTS_CA_BUNDLE; hosts in
+PROXY_NO_INTERCEPT are tunnelled untouched. GET http://<proxy>/__stats returns
+the counters.
+
+The CA and host certificates are kept in PROXY_CERT_DIR, which app.py mounts
+from a docker volume so they are made once rather than in every container.
+Responses are cached in memory for the life of the proxy: with SCAN_MODE=warm
+it outlives the scan and later jobs in the container reuse its cache, while a
+one-off docker run container only shares responses between the tools of one scan.
+
+    python3 cache_proxy.py [port]
+"""
+import os
+import ssl
+import sys
+import json
+import time
+import fcntl
+import select
+import socket
+import threading
+import subprocess
+import http.client
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CACHE_TTL = float(os.getenv("PROXY_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("PROXY_CACHE_MAX_ENTRIES", "5000"))
+# Larger bodies are passed through but not kept
+CACHE_MAX_BODY = int(os.getenv("PROXY_CACHE_MAX_BODY", str(2 * 1024 * 1024)))
+UPSTREAM_TIMEOUT = float(os.getenv("PROXY_UPSTREAM_TIMEOUT", "20"))
+CERT_DIR = os.getenv("PROXY_CERT_DIR", "/tmp/cache-proxy")
+NO_INTERCEPT = {host.strip() for host in os.getenv("PROXY_NO_INTERCEPT", "").split(",") if host.strip()}
+# Lifetime of the CA and host certificates; both are remade a day before they expire
+CERT_DAYS = int(os.getenv("PROXY_CERT_DAYS", "365"))
+
+# Responses worth replaying: profile found, not found, gone or redirected
+CACHEABLE_STATUS = {200, 203, 204, 301, 302, 307, 308, 404, 410}
+
+# Headers that describe one connection and must not be forwarded
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "proxy-connection",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade",
+}
+
+
+class ResponseCache:
+    """Upstream responses by request key for a short TTL, with in-flight deduplication."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, response)
+        self.inflight = {}  # key -> {"event", "response"}
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "uncacheable": 0, "tunnelled": 0, "errors": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def fetch(self, key, loader, cacheable):
+        """Return the response for key, calling loader() at most once across concurrent callers."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1]
+            waiting = self.inflight.get(key)
+            if waiting is None:
+                waiting = self.inflight[key] = {"event": threading.Event(), "response": None}
+                leader = True
+                self.counters["misses"] += 1
+            else:
+                leader = False
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            waiting["event"].wait(UPSTREAM_TIMEOUT * 2)
+            if waiting["response"] is not None:
+                return waiting["response"]
+            # The first request failed; try on our own
+            return loader()
+
+        response = None
+        try:
+            response = loader()
+            return response
+        finally:
+            with self.lock:
+                del self.inflight[key]
+                if response is not None and cacheable(response):
+                    self.entries[key] = (time.monotonic() + self.ttl, response)
+                    self.entries.move_to_end(key)
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+                elif response is not None:
+                    self.counters["uncacheable"] += 1
+            waiting["response"] = response
+            waiting["event"].set()
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            counters["entries"] = len(self.entries)
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        counters["hit_rate"] = (counters["hits"] + counters["coalesced"]) / lookups if lookups else 0.0
+        return counters
+
+
+class CertificateAuthority:
+    """Local CA issuing per-host certificates so HTTPS responses can be cached.
+
+    cert_dir may be shared by several containers: the CA is made once under a
+    file lock, and host certificates are written whole with a rename.
+    """
+
+    def __init__(self, cert_dir):
+        self.cert_dir = cert_dir
+        self.ca_cert = os.path.join(cert_dir, "ca.crt")
+        self.ca_key = os.path.join(cert_dir, "ca.key")
+        self.leaf_key = os.path.join(cert_dir, "leaf.key")
+        self.bundle = os.path.join(cert_dir, "ca-bundle.pem")
+        self.contexts = {}
+        # Issuing runs openssl twice, so each host has its own lock and only
+        # requests for the same new host wait on each other
+        self.host_locks = {}
+        self.lock = threading.Lock()
+        os.makedirs(cert_dir, exist_ok=True)
+        with open(os.path.join(cert_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not self._valid(self.ca_cert):
+                self._make_ca()
+            ca_pem = self._read(self.ca_cert)
+        # Tools trust the system CAs plus ours
+        system_bundle = ssl.get_default_verify_paths().cafile or "/etc/ssl/certs/ca-certificates.crt"
+        system_pem = self._read(system_bundle) if os.path.exists(system_bundle) else ""
+        self._write(self.bundle, system_pem + ca_pem)
+
+    def _openssl(self, *args):
+        subprocess.run(["openssl", *args], check=True, capture_output=True)
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def _write(self, path, text):
+        # Write then rename, so another container never reads half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temporary, path)
+
+    def _valid(self, cert):
+        """Whether cert exists and stays valid for at least another day."""
+        if not os.path.exists(cert):
+            return False
+        check = subprocess.run(["openssl", "x509", "-checkend", "86400", "-noout", "-in", cert], capture_output=True)
+        return check.returncode == 0
+
+    def _make_ca(self):
+        for name in os.listdir(self.cert_dir):
+            if name.startswith("host-"):
+                os.remove(os.path.join(self.cert_dir, name))  # Signed by the CA being replaced
+        self._openssl(
+            "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", str(CERT_DAYS),
+            "-keyout", self.ca_key, "-out", self.ca_cert, "-subj", "/CN=username-setup cache proxy"
+        )
+        # One key for every host certificate keeps issuing them cheap
+        self._openssl("genrsa", "-out", self.leaf_key, "2048")
+
+    def _issue(self, host, cert):
+        name = f"host-{host.replace(':', '_')}.{os.getpid()}.{threading.get_ident()}"
+        csr = os.path.join(self.cert_dir, f"{name}.csr")
+        extensions = os.path.join(self.cert_dir, f"{name}.ext")
+        kind = "IP" if host.replace(".", "").isdigit() or ":" in host else "DNS"
+        with open(extensions, "w", encoding="utf-8") as ext_file:
+            ext_file.write(f"subjectAltName={kind}:{host}\n")
+        try:
+            self._openssl("req", "-new", "-key", self.leaf_key, "-subj", f"/CN={host[:64]}", "-out", csr)
+            self._openssl(
+                "x509", "-req", "-in", csr, "-CA", self.ca_cert, "-CAkey", self.ca_key,
+                "-set_serial", str(int(time.time() * 1000000)), "-days", str(CERT_DAYS),
+                "-extfile", extensions, "-out", f"{csr}.crt"
+            )
+            os.replace(f"{csr}.crt", cert)
+        finally:
+            for path in (csr, extensions, f"{csr}.crt"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def context_for(self, host):
+        """Server-side TLS context presenting a certificate for host."""
+        with self.lock:
+            if host in self.contexts:
+                return self.contexts[host]
+            host_lock = self.host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            with self.lock:
+                if host in self.contexts:
+                    return self.contexts[host]
+            cert = os.path.join(self.cert_dir, f"host-{host.replace(':', '_')}.crt")
+            if not self._valid(cert):
+                self._issue(host, cert)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, self.leaf_key)
+            with self.lock:
+                self.contexts[host] = context
+            return context
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cache = None
+    authority = None
+    upstream_context = ssl.create_default_context()
+
+    def log_message(self, format, *args):
+        pass  # The tools print enough already
+
+    def do_CONNECT(self):
+        host, _, port = self.path.rpartition(":")
+        if self.authority is None or host in NO_INTERCEPT:
+            self._tunnel(host, int(port))
+            return
+        try:
+            context = self.authority.context_for(host)
+        except (subprocess.CalledProcessError, ssl.SSLError, OSError) as e:
+            print(f"cache_proxy: no certificate for {host} ({e}), tunnelling")
+            self._tunnel(host, int(port))
+            return
+        self.send_response(200, "Connection established")
+        self.end_headers()
+        try:
+            self.connection = context.wrap_socket(self.connection, server_side=True)
+        except (ssl.SSLError, OSError):
+            self.close_connection = True
+            return
+        # Serve the decrypted requests on this connection as https://host:port/...
+        self.tls_origin = f"https://{host}" + ("" if port == "443" else f":{port}")
+        self.rfile = self.connection.makefile("rb", self.rbufsize)
+        self.wfile = self.connection.makefile("wb", self.wbufsize)
+        self.close_connection = False
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def _tunnel(self, host, port):
+        self.cache.count("tunnelled")
+        try:
+            upstream = socket.create_connection((host, port), timeout=UPSTREAM_TIMEOUT)
+        except OSError as e:
+            self.send_error(502, f"Cannot reach {host}: {e}")
+            return
+        self.send_response(200, "Connection established")
+        self.end_headers()
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, failed = select.select(sockets, [], sockets, UPSTREAM_TIMEOUT)
+                if failed or not readable:
+                    break
+                for source in readable:
+                    data = source.recv(65536)
+                    if not data:
+                        return
+                    (upstream if source is self.connection else self.connection).sendall(data)
+        finally:
+            upstream.close()
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path == "/__stats":
+            body = json.dumps(self.cache.stats()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._proxy()
+
+    def _proxy(self):
+        url = self.path if "://" in self.path else getattr(self, "tls_origin", "") + self.path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {key: value for key, value in self.headers.items() if key.lower() not in HOP_BY_HOP}
+
+        def load():
+            return self._forward(url, headers, body)
+
+        # Only plain reads are shared between tools
+        if self.command in ("GET", "HEAD") and body is None and "Authorization" not in self.headers:
+            key = (self.command, url, self.headers.get("Accept-Encoding", ""))
+            response = self.cache.fetch(key, load, lambda r: r[0] in CACHEABLE_STATUS and len(r[3]) <= CACHE_MAX_BODY)
+        else:
+            self.cache.count("uncacheable")
+            response = load()
+        if response is None:
+            self.cache.count("errors")
+            self.send_error(502, f"Upstream request to {url} failed")
+            return
+
+        status, reason, response_headers, response_body = response
+        self.send_response(status, reason)
+        for key, value in response_headers:
+            if key.lower() not in HOP_BY_HOP and key.lower() != "content-length":
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(response_body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(response_body)
+
+    do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _proxy
+
+    def _forward(self, url, headers, body):
+        """Send the request upstream; returns (status, reason, headers, body) or None."""
+        parts = urlsplit(url)
+        if parts.scheme == "https":
+            connection = http.client.HTTPSConnection(
+                parts.hostname, parts.port or 443, timeout=UPSTREAM_TIMEOUT, context=self.upstream_context
+            )
+        else:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=UPSTREAM_TIMEOUT)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        try:
+            connection.request(self.command, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.reason, response.getheaders(), response.read()
+        except (OSError, http.client.HTTPException) as e:
+            print(f"cache_proxy: {self.command} {url} failed: {e}")
+            return None
+        finally:
+            connection.close()
+
+
+def start_proxy(port=0, intercept=True):
+    """Run the proxy in background threads; returns the server (server.server_port is the port)."""
+    ProxyHandler.cache = ResponseCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+    ProxyHandler.authority = CertificateAuthority(CERT_DIR) if intercept else None
+    server = ThreadingHTTPServer(("127.0.0.1", port), ProxyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("PROXY_CACHE_PORT", "3128"))
+    server = start_proxy(port, intercept=os.getenv("PROXY_INTERCEPT", "1") == "1")
+    print(f"cache_proxy listening on 127.0.0.1:{server.server_port}", flush=True)
+    threading.Event().wait()
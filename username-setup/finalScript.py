@@ -1,21 +1,36 @@
+import os
+import json
+import time
 import subprocess
 
 # Define the paths to both scripts
 script3_path = "./ScriptP3.py"
 final_op2_path = "./final_op2.py"
 
+# Per-job folder set by app.py; the stage timings are left there for it to read
+output_dir = os.getenv("OUTPUT_DIR", "./combined_output")
+
 def run_script(script_path):
+    started = time.monotonic()
     try:
         print(f"Running script: {script_path}")
         subprocess.run(["python3", script_path], check=True)
         print(f"Script {script_path} completed successfully.\n")
     except subprocess.CalledProcessError as e:
         print(f"Error occurred while running {script_path}: {e}")
+    return round(time.monotonic() - started, 3)
+
+stages = {}
 
 # Run Script3.py
-run_script(script3_path)
+stages["tools"] = run_script(script3_path)
 
 # Run final_op2.py
-run_script(final_op2_path)
+stages["merge"] = run_script(final_op2_path)
+
+# Hand the stage timings back to app.py; final_op2.py skips "_" files
+os.makedirs(output_dir, exist_ok=True)
+with open(os.path.join(output_dir, "_timings.json"), "w", encoding="utf-8") as timings_file:
+    json.dump({"stages": stages}, timings_file, indent=4)
 
 print("All scripts have completed execution.")
@@ -1,13 +1,22 @@
 import os
 import csv
+import gzip
 import json
 
 # Define folder and output path
-input_folder = "combined_output"  # Adjusted folder name
-output_file = "final_output.json"
+input_folder = os.getenv("OUTPUT_DIR", "combined_output")  # Per-job folder set by app.py
 
-# Initialize a dictionary to hold the combined data with filenames as keys
-combined_data = {}
+# Grouped scans (USERNAMES) keep each username's files in <input_folder>/<username>/
+usernames = [name for name in os.getenv("USERNAMES", "").split(",") if name]
+
+# "stream" writes compact JSON file by file; "memory" builds one dict and pretty-prints it
+merge_mode = os.getenv("MERGE_MODE", "stream")
+
+# Gzip the streamed output as final_output.json.gz
+merge_gzip = os.getenv("MERGE_GZIP") == "1"
+
+# Separators for compact JSON output
+COMPACT = (",", ":")
 
 # Function to convert CSV to JSON format
 def csv_to_json(csv_file_path):
@@ -18,25 +27,98 @@ def csv_to_json(csv_file_path):
             data.append(row)
     return data
 
-# Loop through each file in the input folder
-for filename in os.listdir(input_folder):
-    file_path = os.path.join(input_folder, filename)
-    
-    # Check if the file is a CSV file
-    if filename.endswith(".csv"):
-        # Convert CSV to JSON and add to combined data under filename as key
-        csv_data = csv_to_json(file_path)
-        combined_data[filename] = csv_data
-
-    # Check if the file is a JSON file
-    elif filename.endswith(".json"):
-        # Load JSON data and add to combined data under filename as key
-        with open(file_path, mode='r', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-            combined_data[filename] = json_data
-
-# Save the combined data to the final JSON output file
-with open(output_file, mode='w', encoding='utf-8') as output_json_file:
-    json.dump(combined_data, output_json_file, indent=4)
-
-print(f"Combined data with filenames has been written to {output_file}")
+# Function to list the tool output files to merge
+def files_to_merge(input_folder):
+    for filename in sorted(os.listdir(input_folder)):
+        # Skip the output of a previous merge and internal files such as _tool_status.json
+        if filename.startswith("final_output.json") or filename.startswith("_"):
+            continue
+        if filename.endswith(".csv") or filename.endswith(".json"):
+            yield filename, os.path.join(input_folder, filename)
+
+# Function to write a CSV file as a JSON array, one row at a time
+def write_csv_rows(csv_file_path, output):
+    output.write("[")
+    try:
+        with open(csv_file_path, mode='r', encoding='utf-8') as csv_file:
+            for index, row in enumerate(csv.DictReader(csv_file)):
+                if index:
+                    output.write(",")
+                output.write(json.dumps(row, separators=COMPACT))
+    finally:
+        # Keep the output valid even if the CSV breaks part way through
+        output.write("]")
+
+# Function to merge file by file into compact JSON, holding one file's JSON at a time
+def merge_streaming(input_folder, output_file):
+    path = output_file + ".gz" if merge_gzip else output_file
+    temp_path = path + ".tmp"
+    opener = gzip.open if merge_gzip else open
+    with opener(temp_path, mode='wt', encoding='utf-8') as output:
+        output.write("{")
+        needs_comma = False
+        for filename, file_path in files_to_merge(input_folder):
+            # A tool cut off at its deadline may leave a broken file; skip it, keep the rest
+            try:
+                if filename.endswith(".csv"):
+                    if needs_comma:
+                        output.write(",")
+                    output.write(json.dumps(filename) + ":")
+                    needs_comma = True
+                    write_csv_rows(file_path, output)
+                else:
+                    # Parse before writing the key, so a broken file leaves nothing behind
+                    with open(file_path, mode='r', encoding='utf-8') as json_file:
+                        json_data = json.load(json_file)
+                    if needs_comma:
+                        output.write(",")
+                    output.write(json.dumps(filename) + ":")
+                    json.dump(json_data, output, separators=COMPACT)
+                    needs_comma = True
+            except Exception as e:
+                print(f"Error processing file {filename}: {e}")
+        output.write("}")
+    # Publish the finished file in one step so readers never see half of it
+    os.replace(temp_path, path)
+    return path
+
+# Function to merge everything into one dict and pretty-print it
+def merge_in_memory(input_folder, output_file):
+    # Initialize a dictionary to hold the combined data with filenames as keys
+    combined_data = {}
+
+    for filename, file_path in files_to_merge(input_folder):
+        # Check if the file is a CSV file
+        if filename.endswith(".csv"):
+            # Convert CSV to JSON and add to combined data under filename as key
+            try:
+                csv_data = csv_to_json(file_path)
+                combined_data[filename] = csv_data
+            except Exception as e:
+                print(f"Error processing CSV file {filename}: {e}")
+
+        # Check if the file is a JSON file
+        else:
+            # Load JSON data and add to combined data under filename as key
+            try:
+                with open(file_path, mode='r', encoding='utf-8') as json_file:
+                    json_data = json.load(json_file)
+                    combined_data[filename] = json_data
+            except Exception as e:
+                print(f"Error processing JSON file {filename}: {e}")
+
+    # Save the combined data to the final JSON output file
+    with open(output_file, mode='w', encoding='utf-8') as output_json_file:
+        json.dump(combined_data, output_json_file, indent=4)
+    return output_file
+
+def main():
+    merge = merge_in_memory if merge_mode == "memory" else merge_streaming
+    folders = [os.path.join(input_folder, name) for name in usernames] if len(usernames) > 1 else [input_folder]
+    for folder in folders:
+        path = merge(folder, os.path.join(folder, "final_output.json"))
+        print(f"Combined data with filenames has been written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import queue
+import subprocess
+import threading
+import time
+import uuid
+
+
+class ContainerPool:
+    """Keep pre-started containers of one image and dispatch jobs to them with docker exec."""
+
+    def __init__(self, image, size, run_args=(), max_jobs=25, health_interval=60):
+        self.image = image
+        self.size = size
+        self.run_args = list(run_args)
+        self.max_jobs = max_jobs
+        self.health_interval = health_interval
+        self.idle = queue.Queue()
+        self.containers = set()
+        self.lock = threading.Lock()
+        self.recycled = 0
+
+    def start(self):
+        """Start the pool's containers in the background."""
+        threading.Thread(target=self._fill, daemon=True).start()
+
+    def _fill(self):
+        for _ in range(self.size):
+            self._replace(None)
+
+    def _launch(self):
+        # Container names cannot hold the ":" or "/" of a tagged image name
+        name = f"{self.image.replace(':', '-').replace('/', '-')}-warm-{uuid.uuid4().hex[:8]}"
+        # Keep the container alive doing nothing; jobs run through docker exec
+        subprocess.run(
+            ["docker", "run", "-d", "--rm", "--name", name, "--label", "warm-pool=1",
+             *self.run_args, "--entrypoint", "sleep", self.image, "infinity"],
+            check=True, capture_output=True, text=True
+        )
+        with self.lock:
+            self.containers.add(name)
+        return {"name": name, "jobs": 0, "checked_at": time.monotonic()}
+
+    def _remove(self, container):
+        with self.lock:
+            self.containers.discard(container["name"])
+        subprocess.run(["docker", "rm", "-f", container["name"]], capture_output=True, text=True)
+
+    def _replace(self, container):
+        """Remove a container (if given) and put a fresh one in the idle queue."""
+        if container is not None:
+            self._remove(container)
+            self.recycled += 1
+        try:
+            self.idle.put(self._launch())
+        except subprocess.CalledProcessError as e:
+            print(f"Error starting warm container for {self.image}: {e.stderr or e}")
+
+    def _healthy(self, container):
+        try:
+            subprocess.run(
+                ["docker", "exec", container["name"], "true"],
+                check=True, capture_output=True, timeout=10
+            )
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return False
+
+    def acquire(self, timeout=None):
+        """Take an idle, healthy container out of the pool."""
+        while True:
+            container = self.idle.get(timeout=timeout)
+            if time.monotonic() - container["checked_at"] < self.health_interval:
+                return container
+            if self._healthy(container):
+                container["checked_at"] = time.monotonic()
+                return container
+            print(f"Warm container {container['name']} failed its health check, replacing it")
+            self._replace(container)
+
+    def release(self, container, failed=False):
+        """Return a container after a job, recycling it when worn out or broken."""
+        container["jobs"] += 1
+        if failed and self._healthy(container):
+            container["checked_at"] = time.monotonic()
+        elif failed:
+            print(f"Warm container {container['name']} is unhealthy after a failed job, replacing it")
+            self._replace(container)
+            return
+        if container["jobs"] >= self.max_jobs:
+            self._replace(container)
+        else:
+            self.idle.put(container)
+
+    def exec_command(self, container, env, command):
+        """Build the docker exec command for running a job inside a container."""
+        env_args = [arg for key, value in env.items() for arg in ("-e", f"{key}={value}")]
+        return ["docker", "exec", *env_args, container["name"], *command]
+
+    def shutdown(self):
+        with self.lock:
+            names = list(self.containers)
+        for name in names:
+            self._remove({"name": name})
+
+    def stats(self):
+        with self.lock:
+            running = len(self.containers)
+        return {"image": self.image, "size": self.size, "running": running,
+                "idle": self.idle.qsize(), "recycled": self.recycled}